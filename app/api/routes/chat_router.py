@@ -1,13 +1,21 @@
 import uuid
+from typing import Optional
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_session
 from app.core.dependencies import get_current_user
-from app.models.user_model import User
-from app.schemas.chat_schema import ChatCreate, ChatRead
+from app.schemas.chat_schema import (
+    ChatCreate,
+    ChatMarkRead,
+    ChatPage,
+    ChatRead,
+    ChatReadState,
+)
+from app.schemas.user_schema import UserRead
 from app.services.chat_service import ChatService
+from app.services.ws_service import ws_service
 
 router = APIRouter(
     prefix="/chats",
@@ -21,28 +29,33 @@ chat_service = ChatService()
 async def create_chat(
     data: ChatCreate,
     session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: UserRead = Depends(get_current_user),
 ):
-    chat = await chat_service.create_chat(
-        creator=current_user,
+    return await chat_service.create_chat(
+        creator_id=current_user.id,
         receiver_id=data.receiver_id,
         session=session,
     )
-    return ChatRead(
-        id=chat.id,
-        creator_id=chat.creator_id,
-        users=[u for u in chat.users],
-    )
 
 
-@router.get("/user", response_model=list[ChatRead])
+@router.get("/user", response_model=ChatPage)
 async def get_user_chats(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
+    fast: bool = Query(False, description="Encode rows directly, skipping models"),
     session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: UserRead = Depends(get_current_user),
 ):
-    chats = await chat_service.get_user_chats(current_user.id, session)
-
-    return chats
+    if fast:
+        return Response(
+            await chat_service.get_user_chats_json(
+                current_user.id, session, limit=limit, cursor=cursor
+            ),
+            media_type="application/json",
+        )
+    return await chat_service.get_user_chats(
+        current_user.id, session, limit=limit, cursor=cursor
+    )
 
 
 @router.get("/{chat_id}", response_model=ChatRead)
@@ -50,13 +63,35 @@ async def get_chat(
     chat_id: uuid.UUID,
     session: AsyncSession = Depends(get_session),
 ):
-    chat = await chat_service.get_chat(chat_id, session)
-    return ChatRead(
-        id=chat.id,
-        creator_id=chat.creator_id,
-        users=[u for u in chat.users],
+    return await chat_service.get_chat(chat_id, session)
+
+
+@router.post("/{chat_id}/read", response_model=ChatReadState)
+async def mark_chat_read(
+    chat_id: uuid.UUID,
+    data: Optional[ChatMarkRead] = None,
+    session: AsyncSession = Depends(get_session),
+    current_user: UserRead = Depends(get_current_user),
+):
+    state = await chat_service.mark_read(
+        chat_id,
+        current_user.id,
+        session,
+        message_id=data.message_id if data else None,
     )
 
+    if state.last_read_message_id:
+        await ws_service.broadcast(
+            chat_id,
+            {
+                "type": "READ",
+                "chatId": chat_id,
+                "userId": current_user.id,
+                "messageId": state.last_read_message_id,
+            },
+        )
+    return state
+
 
 @router.delete("/{chat_id}", status_code=status.HTTP_200_OK)
 async def delete_chat(
@@ -0,0 +1,136 @@
+import os
+import uuid
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.database import AsyncSessionLocal, get_session
+from app.core.dependencies import get_current_user, get_current_user_media
+from app.schemas.file_schema import FileByHash, FileRead
+from app.schemas.user_schema import UserRead
+from app.services.file_service import FileService
+
+router = APIRouter(prefix="/files", tags=["Files"])
+
+file_service = FileService()
+
+# Attachment ids are never reused and blobs never change, so whatever was
+# served once under a URL is valid there forever. Private: only the
+# browser may keep it, never a shared cache.
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+# Served inline; anything else is a download. SVG can carry scripts.
+INLINE_MEDIA_PREFIXES = ("image/", "video/", "audio/")
+SCRIPTABLE_MEDIA_TYPES = {"image/svg+xml"}
+
+
+@router.post("/by-hash", response_model=FileRead, status_code=status.HTTP_201_CREATED)
+async def create_file_by_hash(
+    data: FileByHash,
+    session: AsyncSession = Depends(get_session),
+    current_user: UserRead = Depends(get_current_user),
+):
+    return await file_service.save_file_by_hash(
+        data.sha256, data.filename, current_user.id, session
+    )
+
+
+@router.api_route("/{file_id}/content", methods=["GET", "HEAD"])
+async def get_file_content(
+    file_id: uuid.UUID,
+    request: Request,
+    current_user: UserRead = Depends(get_current_user_media),
+):
+    # Own short session: large downloads must not pin a database connection
+    # for as long as the body takes to stream.
+    async with AsyncSessionLocal() as session:
+        db_file = await file_service.get_stored_file(file_id, session, current_user.id)
+
+    return await serve_file(
+        request,
+        db_file.path,
+        etag=f'"{db_file.sha256}"' if db_file.sha256 else None,
+        filename=db_file.filename,
+        media_type=db_file.mime_type or "application/octet-stream",
+    )
+
+
+@router.api_route("/{file_id}/thumbnail", methods=["GET", "HEAD"])
+async def get_file_thumbnail(
+    file_id: uuid.UUID,
+    request: Request,
+    current_user: UserRead = Depends(get_current_user_media),
+):
+    async with AsyncSessionLocal() as session:
+        db_file = await file_service.get_stored_file(file_id, session, current_user.id)
+
+    if not db_file.thumbnail_path:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Thumbnail not found",
+        )
+
+    return await serve_file(
+        request,
+        db_file.thumbnail_path,
+        etag=f'"{db_file.sha256}-thumb"' if db_file.sha256 else None,
+        media_type="image/webp",
+    )
+
+
+async def serve_file(
+    request: Request,
+    path: str,
+    etag: Optional[str] = None,
+    filename: Optional[str] = None,
+    media_type: str = "application/octet-stream",
+) -> Response:
+    # Uploads share the API origin: browsers must not sniff them into HTML,
+    # and whatever they do render runs without scripts or same-origin access.
+    headers = {
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "X-Content-Type-Options": "nosniff",
+        "Content-Security-Policy": "sandbox",
+    }
+    if etag:
+        headers["ETag"] = etag
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    try:
+        stat_result = await run_in_threadpool(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found",
+        )
+
+    # FileResponse answers Range/If-Range with 206/416 and hands the path to
+    # the server for zero-copy sending when it supports ASGI pathsend.
+    return FileResponse(
+        path,
+        stat_result=stat_result,
+        filename=filename,
+        media_type=media_type,
+        content_disposition_type="inline" if is_inline(media_type) else "attachment",
+        headers=headers,
+    )
+
+
+def is_inline(media_type: str) -> bool:
+    return (
+        media_type.startswith(INLINE_MEDIA_PREFIXES)
+        and media_type not in SCRIPTABLE_MEDIA_TYPES
+    )
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or any(
+        candidate.removeprefix("W/") == etag for candidate in candidates
+    )
@@ -1,13 +1,29 @@
 import uuid
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, File, Form, UploadFile, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    Query,
+    Response,
+    UploadFile,
+    status,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_session
 from app.core.dependencies import get_current_user
-from app.models.user_model import User
-from app.schemas.message_schema import MessageCreate, MessageRead
+from app.schemas.message_schema import (
+    MessageCreate,
+    MessagePage,
+    MessageRead,
+    MessageSearchPage,
+    MessageSyncRequest,
+    MessageSyncResponse,
+)
+from app.schemas.user_schema import UserRead
 from app.services.file_service import FileService
 from app.services.message_service import MessageService
 from app.services.ws_service import ws_service
@@ -27,33 +43,80 @@ async def send_message(
     chat_id: uuid.UUID = Form(...),
     content: Optional[str] = Form(None),
     files: Optional[List[UploadFile]] = File(None),
+    file_ids: Optional[List[uuid.UUID]] = Form(None),
     session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    current_user: UserRead = Depends(get_current_user),
 ):
     message = await message_service.send_message(
-        data=MessageCreate(chat_id=chat_id, content=content, file_ids=None),
+        data=MessageCreate(chat_id=chat_id, content=content, file_ids=file_ids),
         author_id=current_user.id,
         session=session,
         files=files,
     )
 
-    await ws_service.broadcast(chat_id, {"type": "NEW_MESSAGE"})
+    await ws_service.broadcast(
+        chat_id,
+        {
+            "type": "NEW_MESSAGE",
+            "chatId": chat_id,
+            "messageId": message.id,
+            "seq": message.seq,
+        },
+    )
     return message
 
 
-@router.get("/chat/{chat_id}", response_model=list[MessageRead])
+@router.get("/chat/{chat_id}", response_model=MessagePage)
 async def get_chat_messages(
     chat_id: uuid.UUID,
+    before: Optional[str] = Query(None),
+    after: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    fast: bool = Query(False, description="Encode rows directly, skipping models"),
+    session: AsyncSession = Depends(get_session),
+):
+    if fast:
+        return Response(
+            await message_service.get_chat_messages_json(
+                chat_id, session, before=before, after=after, limit=limit
+            ),
+            media_type="application/json",
+        )
+    return await message_service.get_chat_messages(
+        chat_id, session, before=before, after=after, limit=limit
+    )
+
+
+@router.get("/search", response_model=MessageSearchPage)
+async def search_messages(
+    q: str = Query(..., min_length=1, max_length=200),
+    chat_id: Optional[uuid.UUID] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
     session: AsyncSession = Depends(get_session),
+    current_user: UserRead = Depends(get_current_user),
 ):
-    return await message_service.get_chat_messages(chat_id, session)
+    return await message_service.search_messages(
+        current_user.id, q, session, chat_id=chat_id, cursor=cursor, limit=limit
+    )
+
+
+@router.post("/sync", response_model=MessageSyncResponse)
+async def sync_messages(
+    data: MessageSyncRequest,
+    session: AsyncSession = Depends(get_session),
+    current_user: UserRead = Depends(get_current_user),
+):
+    return await message_service.sync_messages(
+        current_user.id, data.chats, session, limit=data.limit
+    )
 
 
 @router.put("/{message_id}", response_model=MessageRead)
 async def update_message(
     message_id: uuid.UUID,
     content: str = Form(...),
-    current_user: User = Depends(get_current_user),
+    current_user: UserRead = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ):
     return await message_service.update_message(
@@ -67,7 +130,7 @@ async def update_message(
 @router.delete("/{message_id}", status_code=status.HTTP_200_OK)
 async def delete_message(
     message_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: UserRead = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ):
     return await message_service.delete_message(
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends, Response
+
+from app.core.dependencies import require_internal
+from app.core.metrics import registry
+
+router = APIRouter(tags=["System"], dependencies=[Depends(require_internal)])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
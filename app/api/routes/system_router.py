@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends
+
+from app.core.admission import admission_controller
+from app.core.database import get_pool_stats
+from app.core.dependencies import require_internal
+from app.core.hashing import password_hasher
+from app.core.principal_cache import principal_cache
+from app.schemas.system_schema import (
+    AdmissionStats,
+    PasswordHashingStats,
+    PoolStats,
+    PrincipalCacheStats,
+)
+
+router = APIRouter(
+    prefix="/system", tags=["System"], dependencies=[Depends(require_internal)]
+)
+
+
+@router.get("/db-pool", response_model=PoolStats)
+async def get_db_pool_stats():
+    return PoolStats(**get_pool_stats())
+
+
+@router.get("/auth-cache", response_model=PrincipalCacheStats)
+async def get_auth_cache_stats():
+    return PrincipalCacheStats(**principal_cache.stats())
+
+
+@router.get("/password-hashing", response_model=PasswordHashingStats)
+async def get_password_hashing_stats():
+    return PasswordHashingStats(**password_hasher.stats())
+
+
+@router.get("/admission", response_model=AdmissionStats)
+async def get_admission_stats():
+    return AdmissionStats(**admission_controller.stats())
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_session
 from app.core.dependencies import get_current_user
-from app.schemas.user_schema import UserRead
+from app.schemas.user_schema import UserPage, UserRead
 from app.services.user_service import UserService
 
 router = APIRouter(
@@ -11,9 +13,25 @@ router = APIRouter(
 )
 
 
-@router.get("/", response_model=list[UserRead], status_code=200)
-async def get_all_users(session: AsyncSession = Depends(get_session)):
-    return await UserService().get_all_users(session)
+@router.get("/", response_model=UserPage, status_code=200)
+async def search_users(
+    q: str = Query(..., min_length=1, max_length=100),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=50),
+    fast: bool = Query(False, description="Encode rows directly, skipping models"),
+    session: AsyncSession = Depends(get_session),
+    current_user: UserRead = Depends(get_current_user),
+):
+    if fast:
+        return Response(
+            await UserService().search_users_json(
+                current_user.id, q, session, cursor=cursor, limit=limit
+            ),
+            media_type="application/json",
+        )
+    return await UserService().search_users(
+        current_user.id, q, session, cursor=cursor, limit=limit
+    )
 
 
 @router.get("/me", response_model=UserRead, status_code=200)
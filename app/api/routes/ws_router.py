@@ -1,25 +1,175 @@
+import math
+from typing import Any, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from pydantic import ValidationError
 
+from app.core.admission import admission_controller
+from app.core.database import AsyncSessionLocal
 from app.core.dependencies import get_current_user_ws
-from app.models.user_model import User
-from app.services.ws_service import ws_service
+from app.schemas.message_schema import MessageCreate
+from app.schemas.user_schema import UserRead
+from app.services.chat_service import ChatService
+from app.services.file_service import FileService
+from app.services.message_service import MessageService
+from app.services.ws_service import Connection, ws_service
 
 router = APIRouter(prefix="/ws", tags=["WebSocket"])
 
+chat_service = ChatService()
+message_service = MessageService(FileService())
+
+MAX_CHAT_IDS_PER_FRAME = 500
+
+
+@router.websocket("")
+async def websocket_user(
+    websocket: WebSocket,
+    chats: Optional[str] = None,
+    user: UserRead = Depends(get_current_user_ws),
+):
+    try:
+        requested = parse_chat_ids(chats.split(",")) if chats else None
+    except ValueError:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    chat_ids = await get_member_chat_ids(user.id, requested)
+    connection = await ws_service.connect(user.id, websocket, chat_ids)
+    ws_service.send(connection, {"type": "READY", "chatIds": list(chat_ids)})
+    await serve(connection)
+
 
 @router.websocket("/chats/{chat_id}")
 async def websocket_chat(
     websocket: WebSocket,
     chat_id: UUID,
-    user: User = Depends(get_current_user_ws),
+    user: UserRead = Depends(get_current_user_ws),
 ):
-    await ws_service.connect(chat_id, websocket)
+    chat_ids = await get_member_chat_ids(user.id, [chat_id])
+    if not chat_ids:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
 
+    connection = await ws_service.connect(user.id, websocket, chat_ids)
+    await serve(connection)
+
+
+async def serve(connection: Connection):
     try:
         while True:
-            await websocket.receive_json()
-
+            try:
+                frame = await connection.websocket.receive_json()
+            except (ValueError, KeyError):
+                ws_service.send(
+                    connection, {"type": "ERROR", "detail": "Invalid frame"}
+                )
+                continue
+            await handle_frame(connection, frame)
     except WebSocketDisconnect:
-        await ws_service.disconnect(chat_id, websocket)
+        pass
+    finally:
+        await ws_service.disconnect(connection)
+
+
+async def handle_frame(connection: Connection, frame: Any):
+    kind = frame.get("type") if isinstance(frame, dict) else None
+
+    if kind in ("SUBSCRIBE", "UNSUBSCRIBE"):
+        try:
+            chat_ids = parse_chat_ids(frame.get("chatIds"))
+        except ValueError:
+            ws_service.send(connection, {"type": "ERROR", "detail": "Invalid chatIds"})
+            return
+
+        if kind == "SUBSCRIBE":
+            chat_ids = await get_member_chat_ids(connection.user_id, chat_ids)
+            ws_service.subscribe(connection, chat_ids)
+            ws_service.send(
+                connection, {"type": "SUBSCRIBED", "chatIds": list(chat_ids)}
+            )
+        else:
+            ws_service.unsubscribe(connection, chat_ids)
+            ws_service.send(
+                connection, {"type": "UNSUBSCRIBED", "chatIds": list(chat_ids)}
+            )
+        return
+
+    if kind == "SEND_MESSAGE":
+        await send_message(connection, frame)
+        return
+
+    ws_service.send(connection, {"type": "ERROR", "detail": "Unknown frame type"})
+
+
+async def send_message(connection: Connection, frame: dict):
+    client_id = frame.get("clientId")
+    if not isinstance(client_id, (str, type(None))):
+        client_id = None
+
+    def reject(detail: Any, **extra: Any):
+        ws_service.send(
+            connection,
+            {"type": "ERROR", "clientId": client_id, "detail": detail, **extra},
+        )
+
+    retry_after = admission_controller.take_send(connection.user_id)
+    if retry_after > 0:
+        reject("Too many requests", retryAfter=math.ceil(retry_after))
+        return
+
+    try:
+        data = MessageCreate(chat_id=frame.get("chatId"), content=frame.get("content"))
+    except ValidationError as e:
+        reject(e.errors(include_url=False, include_context=False))
+        return
+
+    # Subscriptions are membership-checked, so this doubles as authorization.
+    if data.chat_id not in connection.chat_ids:
+        reject("Not subscribed to this chat")
+        return
+
+    try:
+        async with AsyncSessionLocal() as session:
+            message = await message_service.send_message(
+                data=data, author_id=connection.user_id, session=session
+            )
+    except HTTPException as e:
+        reject(e.detail)
+        return
+
+    ws_service.send(
+        connection,
+        {
+            "type": "ACK",
+            "clientId": client_id,
+            "chatId": message.chat_id,
+            "messageId": message.id,
+            "createdAt": message.created_at,
+        },
+    )
+    await ws_service.broadcast(
+        message.chat_id,
+        {"type": "NEW_MESSAGE", "chatId": message.chat_id, "messageId": message.id},
+    )
+
+
+async def get_member_chat_ids(
+    user_id: UUID, chat_ids: Optional[list[UUID]] = None
+) -> set[UUID]:
+    async with AsyncSessionLocal() as session:
+        return await chat_service.get_member_chat_ids(user_id, session, chat_ids)
+
+
+def parse_chat_ids(raw: Any) -> list[UUID]:
+    if not isinstance(raw, list) or len(raw) > MAX_CHAT_IDS_PER_FRAME:
+        raise ValueError("chatIds must be a list")
+    return [UUID(str(value)) for value in raw]
@@ -0,0 +1,200 @@
+import math
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.encoding import dumps
+from app.core.principal_cache import principal_cache
+
+
+class RateLimit:
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+
+
+class TokenBuckets:
+    # One bucket per (route class, caller), kept as plain [tokens, updated]
+    # pairs; the least recently used callers are forgotten past max_keys,
+    # which only ever hands them a fresh, full bucket.
+    def __init__(self, max_keys: int) -> None:
+        self.max_keys = max_keys
+        self.buckets: OrderedDict[tuple[str, str], list[float]] = OrderedDict()
+
+    def take(self, key: tuple[str, str], limit: RateLimit) -> float:
+        # Returns 0 when a token was taken, otherwise the seconds until one
+        # will be available. A non-positive rate turns the limit off.
+        if limit.rate <= 0:
+            return 0.0
+
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = [limit.burst, now]
+            self.buckets[key] = bucket
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+            bucket[0] = min(limit.burst, bucket[0] + (now - bucket[1]) * limit.rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / limit.rate
+
+
+class AdmissionController:
+    def __init__(self) -> None:
+        self.enabled = settings.admission_enabled
+        self.max_in_flight = settings.admission_max_in_flight
+        self.limits = {
+            "auth": RateLimit(settings.rate_auth_per_second, settings.rate_auth_burst),
+            "send": RateLimit(settings.rate_send_per_second, settings.rate_send_burst),
+            "default": RateLimit(
+                settings.rate_default_per_second, settings.rate_default_burst
+            ),
+        }
+        self.buckets = TokenBuckets(settings.admission_max_keys)
+        self.in_flight = 0
+        self.in_flight_peak = 0
+        self.admitted = 0
+        self.rejected_overload = 0
+        self.rejected_rate: Counter[str] = Counter()
+
+    def admit(self, scope: Scope) -> Optional[tuple[int, str, float]]:
+        # Returns None when the request may proceed (the caller must then
+        # release it), otherwise the status, detail and retry delay to send.
+        if self.in_flight >= self.max_in_flight:
+            self.rejected_overload += 1
+            return 503, "Server is busy, try again later", 1
+
+        route_class = self.classify(scope["method"], scope["path"])
+        retry_after = self.buckets.take(
+            (route_class, self.identify(scope, route_class)), self.limits[route_class]
+        )
+        if retry_after > 0:
+            self.rejected_rate[route_class] += 1
+            return 429, "Too many requests", retry_after
+
+        self.admitted += 1
+        self.in_flight += 1
+        self.in_flight_peak = max(self.in_flight_peak, self.in_flight)
+        return None
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+    def take_send(self, user_id: Any) -> float:
+        # Messages sent over a WebSocket never pass the middleware, so they
+        # draw from the same per-user bucket here. Returns the retry delay,
+        # 0 when the message may go out.
+        if not self.enabled:
+            return 0.0
+        retry_after = self.buckets.take(
+            ("send", f"user:{user_id}"), self.limits["send"]
+        )
+        if retry_after > 0:
+            self.rejected_rate["send"] += 1
+        return retry_after
+
+    def classify(self, method: str, path: str) -> str:
+        if path.startswith("/api/auth/"):
+            return "auth"
+        if method == "POST" and path.rstrip("/") == "/api/messages":
+            return "send"
+        return "default"
+
+    def identify(self, scope: Scope, route_class: str) -> str:
+        # Signed-in callers are limited per user, so people sharing a NAT do
+        # not starve each other. Anonymous traffic and every auth attempt are
+        # limited per client address.
+        if route_class != "auth":
+            token = bearer_token(scope)
+            principal = principal_cache.peek(token) if token else None
+            if principal is not None:
+                return f"user:{principal.id}"
+
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "in_flight_peak": self.in_flight_peak,
+            "admitted": self.admitted,
+            "rejected_overload": self.rejected_overload,
+            "rejected_rate": dict(self.rejected_rate),
+            "tracked_callers": len(self.buckets.buckets),
+        }
+
+
+admission_controller = AdmissionController()
+
+
+def bearer_token(scope: Scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                return token
+    return None
+
+
+class AdmissionMiddleware:
+    # Runs before routing and before any database work, so shedding a
+    # request costs a dict lookup rather than a connection checkout.
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.controller = admission_controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.controller.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        rejection = self.controller.admit(scope)
+        if rejection is not None:
+            await self.reject(send, *rejection)
+            return
+
+        # The slot is given back once the response starts: file downloads
+        # stream for as long as the client takes, and must not count as
+        # load for all that time.
+        released = False
+
+        async def send_and_release(message: Message) -> None:
+            nonlocal released
+            if message["type"] == "http.response.start" and not released:
+                released = True
+                self.controller.release()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_release)
+        finally:
+            if not released:
+                self.controller.release()
+
+    async def reject(
+        self, send: Send, status_code: int, detail: str, retry_after: float
+    ) -> None:
+        body = dumps({"detail": detail})
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status_code,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
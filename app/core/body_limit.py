@@ -0,0 +1,50 @@
+from typing import Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.encoding import dumps
+
+
+def content_length(scope: Scope) -> Optional[int]:
+    for name, value in scope["headers"]:
+        if name == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+class BodyLimitMiddleware:
+    # Refuses bodies that announce more than REQUEST_MAX_BYTES before
+    # anything reads them; otherwise a multipart form is spooled to disk in
+    # full before the upload size check ever runs. Chunked bodies carry no
+    # length and are left to that check.
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.max_bytes = settings.request_max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and self.max_bytes > 0:
+            length = content_length(scope)
+            if length is not None and length > self.max_bytes:
+                await self.reject(send)
+                return
+
+        await self.app(scope, receive, send)
+
+    async def reject(self, send: Send) -> None:
+        body = dumps({"detail": "Request body is too large"})
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"connection", b"close"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
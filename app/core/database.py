@@ -1,17 +1,160 @@
-import os
+import time
+from contextvars import ContextVar, Token
+from typing import Any, Optional
 
-from dotenv import load_dotenv
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 
-load_dotenv()
+from app.core.config import settings
 
-DB_URL = os.getenv("DB_URL")
 
-engine = create_async_engine(DB_URL, echo=True, poolclass=NullPool)
+class PoolTelemetry:
+    def __init__(self) -> None:
+        self.connects = 0
+        self.connect_seconds = 0.0
+        self.connect_max_seconds = 0.0
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.wait_max_seconds = 0.0
+
+    def record_connect(self, elapsed: float) -> None:
+        self.connects += 1
+        self.connect_seconds += elapsed
+        self.connect_max_seconds = max(self.connect_max_seconds, elapsed)
+
+    def record_checkout(self, elapsed: float) -> None:
+        self.checkouts += 1
+        self.wait_seconds += elapsed
+        self.wait_max_seconds = max(self.wait_max_seconds, elapsed)
+
+
+pool_telemetry = PoolTelemetry()
+
+
+class QueryStats:
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+
+    def record(self, elapsed: float) -> None:
+        self.count += 1
+        self.seconds += elapsed
+
+
+query_totals = QueryStats()
+# Stats of the HTTP request being served, if anything is tracking them. The
+# object is shared, not copied, with the greenlets SQLAlchemy runs statements
+# in, so what they record is seen by the request that owns it.
+request_queries: ContextVar[Optional[QueryStats]] = ContextVar(
+    "request_queries", default=None
+)
+
+
+def track_queries() -> tuple[QueryStats, Optional[Token]]:
+    # Nested middlewares share the request's stats instead of splitting them;
+    # only the one that created them gets a token to reset.
+    stats = request_queries.get()
+    if stats is not None:
+        return stats, None
+    stats = QueryStats()
+    return stats, request_queries.set(stats)
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    # Time spent waiting for a pooled connection, including opening a new
+    # one when the pool is still growing.
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_telemetry.record_checkout(time.perf_counter() - started)
+
+
+def build_engine_options() -> dict[str, Any]:
+    options: dict[str, Any] = {"echo": settings.db_echo}
+
+    if settings.db_statement_timeout_ms > 0:
+        options["connect_args"] = {
+            "server_settings": {
+                "statement_timeout": str(settings.db_statement_timeout_ms)
+            }
+        }
+
+    if settings.db_profile == "nullpool":
+        options["poolclass"] = NullPool
+        return options
+
+    options.update(
+        poolclass=InstrumentedAsyncPool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+    return options
+
+
+engine = create_async_engine(settings.db_url, **build_engine_options())
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
 
+@event.listens_for(engine.sync_engine, "do_connect")
+def _timed_connect(dialect, connection_record, cargs, cparams):
+    started = time.perf_counter()
+    connection = dialect.connect(*cargs, **cparams)
+    pool_telemetry.record_connect(time.perf_counter() - started)
+    return connection
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _start_query(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _end_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+    query_totals.record(elapsed)
+    stats = request_queries.get()
+    if stats is not None:
+        stats.record(elapsed)
+
+
+def get_pool_stats() -> dict[str, Any]:
+    pool = engine.pool
+    pooled = isinstance(pool, AsyncAdaptedQueuePool)
+    telemetry = pool_telemetry
+
+    return {
+        "profile": settings.db_profile,
+        "pool_size": pool.size() if pooled else 0,
+        "max_overflow": settings.db_max_overflow if pooled else 0,
+        "max_connections": (
+            settings.db_pool_size + settings.db_max_overflow if pooled else None
+        ),
+        "checked_out": pool.checkedout() if pooled else 0,
+        "idle": pool.checkedin() if pooled else 0,
+        "overflow": max(pool.overflow(), 0) if pooled else 0,
+        "connects": telemetry.connects,
+        "connect_avg_ms": (
+            telemetry.connect_seconds / telemetry.connects * 1000
+            if telemetry.connects
+            else 0.0
+        ),
+        "connect_max_ms": telemetry.connect_max_seconds * 1000,
+        "checkouts": telemetry.checkouts,
+        "wait_avg_ms": (
+            telemetry.wait_seconds / telemetry.checkouts * 1000
+            if telemetry.checkouts
+            else 0.0
+        ),
+        "wait_max_ms": telemetry.wait_max_seconds * 1000,
+    }
+
+
 async def get_session():
     async with AsyncSessionLocal() as session:
         yield session
@@ -1,48 +1,79 @@
-from typing import cast
+import hmac
+from typing import Optional, cast
 
-from fastapi import Depends, HTTPException, WebSocket, status
+from fastapi import Depends, HTTPException, Request, WebSocket, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_session
+from app.core.admission import bearer_token
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.principal_cache import principal_cache
 from app.core.security import JWTService
 from app.models.user_model import User
+from app.schemas.user_schema import UserRead
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 jwt_service = JWTService(secret_key="supersecretkey")
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    session: AsyncSession = Depends(get_session),
-) -> User:
+async def authenticate(token: str) -> Optional[UserRead]:
+    # Tokens that were verified recently skip both the JWT decode and the
+    # user lookup.
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
+    payload = jwt_service.decode_access_token(token)
+    user_id = cast(str, payload.get("sub"))
+    if not user_id:
+        raise JWTError("Missing sub")
+
+    # Own short session, opened only on a miss.
+    async with AsyncSessionLocal() as session:
+        user = await session.get(User, user_id)
+    if user is None:
+        return None
+
+    principal = UserRead.model_validate(user)
+    principal_cache.put(token, principal, payload.get("exp"))
+    return principal
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserRead:
+    return await require_user(token)
+
+
+async def get_current_user_media(request: Request) -> UserRead:
+    # Attachments are loaded by <img> and <video> tags, which cannot send
+    # headers, so the token may come as ?token= as on the WebSocket.
+    return await require_user(
+        bearer_token(request.scope) or request.query_params.get("token")
+    )
+
+
+async def require_user(token: Optional[str]) -> UserRead:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        payload = jwt_service.decode_access_token(token)
-        user_id = cast(str, payload.get("sub"))
+    if not token:
+        raise credentials_exception
 
-        if user_id is None:
-            raise credentials_exception
+    try:
+        user = await authenticate(token)
     except JWTError:
         raise credentials_exception
 
-    user = await session.get(User, user_id)
     if user is None:
         raise credentials_exception
 
     return user
 
 
-async def get_current_user_ws(
-    websocket: WebSocket,
-    session: AsyncSession = Depends(get_session),
-) -> User:
+async def get_current_user_ws(websocket: WebSocket) -> UserRead:
     token = websocket.query_params.get("token")
 
     if not token:
@@ -50,17 +81,33 @@ async def get_current_user_ws(
         raise HTTPException(status_code=403, detail="Missing token")
 
     try:
-        payload = jwt_service.decode_access_token(token)
-        user_id = cast(str, payload.get("sub"))
-        if not user_id:
-            raise JWTError("Missing sub")
-    except JWTError:
+        user = await authenticate(token)
+    except (JWTError, HTTPException):
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         raise HTTPException(status_code=403, detail="Invalid token")
 
-    user = await session.get(User, user_id)
     if not user:
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         raise HTTPException(status_code=403, detail="User not found")
 
     return user
+
+
+async def require_internal(request: Request) -> None:
+    # Guards the operational endpoints, which expose internals to anyone
+    # who can reach them.
+    if request.client and request.client.host in settings.internal_allowed_ips:
+        return
+
+    token = bearer_token(request.scope)
+    if (
+        settings.internal_token
+        and token
+        and hmac.compare_digest(token.encode(), settings.internal_token.encode())
+    ):
+        return
+
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Internal endpoint",
+    )
@@ -0,0 +1,22 @@
+from typing import Any
+from uuid import UUID
+
+import orjson
+from pydantic import BaseModel
+
+
+def _default(value: Any) -> Any:
+    # asyncpg hands back its own UUID subclass, which orjson does not accept.
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", by_alias=True)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    return orjson.dumps(value, default=_default, option=orjson.OPT_UTC_Z)
+
+
+def dumps_text(value: Any) -> str:
+    return dumps(value).decode()
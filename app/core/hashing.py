@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+
+class PasswordHasher:
+    # argon2 releases the GIL, so a small thread pool hashes in parallel
+    # while the event loop keeps serving requests and sockets.
+    def __init__(
+        self,
+        workers: int,
+        max_pending: int,
+        time_cost: int,
+        memory_cost: int,
+        parallelism: int,
+    ) -> None:
+        self.context = CryptContext(
+            schemes=["argon2"],
+            deprecated="auto",
+            argon2__time_cost=time_cost,
+            argon2__memory_cost=memory_cost,
+            argon2__parallelism=parallelism,
+        )
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hash"
+        )
+        self.pending = 0
+        self.running = 0
+        self.running_lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.wait_max_seconds = 0.0
+        self.hash_seconds = 0.0
+        self.hash_max_seconds = 0.0
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._run(self.context.verify, password, password_hash)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "running": self.running,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_avg_ms": (
+                self.wait_seconds / self.completed * 1000 if self.completed else 0.0
+            ),
+            "wait_max_ms": self.wait_max_seconds * 1000,
+            "hash_avg_ms": (
+                self.hash_seconds / self.completed * 1000 if self.completed else 0.0
+            ),
+            "hash_max_ms": self.hash_max_seconds * 1000,
+        }
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        # Shed load instead of letting a login storm queue up unbounded work
+        # that would only finish after its clients have given up.
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent authentication requests",
+                headers={"Retry-After": "1"},
+            )
+
+        self.pending += 1
+        queued_at = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, started, finished = await loop.run_in_executor(
+                self.executor, self._timed, func, *args
+            )
+        finally:
+            self.pending -= 1
+
+        # Recorded back on the event loop so the counters need no locking.
+        self.completed += 1
+        self.wait_seconds += started - queued_at
+        self.wait_max_seconds = max(self.wait_max_seconds, started - queued_at)
+        self.hash_seconds += finished - started
+        self.hash_max_seconds = max(self.hash_max_seconds, finished - started)
+        return result
+
+    def _timed(self, func: Callable[..., T], *args: Any) -> tuple[T, float, float]:
+        started = time.perf_counter()
+        with self.running_lock:
+            self.running += 1
+        try:
+            return func(*args), started, time.perf_counter()
+        finally:
+            with self.running_lock:
+                self.running -= 1
+
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+    time_cost=settings.argon2_time_cost,
+    memory_cost=settings.argon2_memory_cost,
+    parallelism=settings.argon2_parallelism,
+)
@@ -0,0 +1,32 @@
+import os
+import uuid
+from typing import Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Runs inside preview worker processes, so this module deliberately imports
+# nothing from the rest of the app.
+
+
+def render_thumbnail(
+    source_path: str, thumbnail_path: str, max_size: int
+) -> Optional[tuple[int, int, Optional[str]]]:
+    try:
+        with Image.open(source_path) as image:
+            width, height = image.size
+            mime_type = Image.MIME.get(image.format or "")
+
+            if not os.path.exists(thumbnail_path):
+                preview = ImageOps.exif_transpose(image)
+                preview.thumbnail((max_size, max_size))
+                if preview.mode not in ("RGB", "RGBA"):
+                    preview = preview.convert("RGBA")
+
+                os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+                temp_path = f"{thumbnail_path}.{uuid.uuid4()}.part"
+                preview.save(temp_path, "WEBP", quality=80)
+                os.replace(temp_path, thumbnail_path)
+
+            return width, height, mime_type
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        return None
@@ -0,0 +1,255 @@
+import math
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable, Optional, Sequence
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.database import query_totals, track_queries
+
+# A minimal in-process registry rendering the Prometheus text format. Values
+# are plain floats updated from the event loop thread only, so recording is
+# a dict lookup and an addition with no locking. Every worker process keeps
+# its own registry.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+BYTES_BUCKETS = tuple(4**n * 1024 for n in range(1, 10))
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: Sequence[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labels)
+        # Unlabelled series are reported from the start, even while zero.
+        self.values: dict[tuple, float] = {} if self.labels else {(): 0}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for key, value in self.values.items():
+            labels = format_labels(self.labels, key)
+            lines.append(f"{self.name}{labels} {format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        self.values[labels] = value
+
+
+class CallbackMetric(Metric):
+    # Reads its values at scrape time from state that is kept anyway, so
+    # the hot path pays nothing for it.
+    def __init__(
+        self, kind: str, name: str, help: str, read: Callable[[], float]
+    ) -> None:
+        super().__init__(name, help)
+        self.kind = kind
+        self.read = read
+
+    def render(self) -> list[str]:
+        return [*super().render(), f"{self.name} {format_value(self.read())}"]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # Per label set: non-cumulative bucket counts (the last one is +Inf),
+        # then the sum of observed values.
+        self.values: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0.0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for key, series in self.values.items():
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, math.inf), series):
+                cumulative += count
+                labels = format_labels(self.labels, key, f'le="{format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {format_value(cumulative)}")
+            labels = format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {format_value(cumulative)}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def callback(
+        self, kind: str, name: str, help: str, read: Callable[[], float]
+    ) -> CallbackMetric:
+        return self.register(CallbackMetric(kind, name, help, read))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route", "status"),
+)
+http_request_db_queries = registry.histogram(
+    "http_request_db_queries",
+    "Database statements run per HTTP request.",
+    ("method", "route"),
+    buckets=COUNT_BUCKETS,
+)
+http_request_db_duration = registry.histogram(
+    "http_request_db_duration_seconds",
+    "Time spent in database statements per HTTP request.",
+    ("method", "route"),
+)
+registry.callback(
+    "counter",
+    "db_queries_total",
+    "Database statements run by this worker.",
+    lambda: query_totals.count,
+)
+registry.callback(
+    "counter",
+    "db_query_duration_seconds_total",
+    "Time spent in database statements by this worker.",
+    lambda: query_totals.seconds,
+)
+ws_connections = registry.gauge(
+    "ws_connections", "Open WebSocket connections on this worker."
+)
+ws_broadcast_recipients = registry.histogram(
+    "ws_broadcast_recipients",
+    "Connections a chat event was queued for on this worker.",
+    buckets=COUNT_BUCKETS,
+)
+ws_send_duration = registry.histogram(
+    "ws_send_duration_seconds", "Time to write one frame to a WebSocket."
+)
+ws_send_failures = registry.counter(
+    "ws_send_failures_total", "WebSocket writes that failed or timed out."
+)
+upload_bytes = registry.counter("upload_bytes_total", "Bytes of uploaded files stored.")
+upload_size = registry.histogram(
+    "upload_size_bytes", "Size of stored uploads.", buckets=BYTES_BUCKETS
+)
+upload_duration = registry.histogram(
+    "upload_duration_seconds",
+    "Time to hash and store an upload, including waiting for a slot.",
+    ("outcome",),
+)
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        queries, token = track_queries()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if token is not None:
+                token.var.reset(token)
+            # Templates, not raw paths, keep label cardinality bounded.
+            route = route_template(scope)
+            method = scope["method"]
+            http_request_duration.observe(
+                time.perf_counter() - started, method, route, str(status_code)
+            )
+            http_request_db_queries.observe(queries.count, method, route)
+            http_request_db_duration.observe(queries.seconds, method, route)
+
+
+def route_template(scope: Scope) -> str:
+    route: Optional[object] = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+
+from app.core.config import settings
+from app.models.user_model import User
+from app.schemas.user_schema import UserRead
+
+
+class PrincipalCache:
+    # Verified access tokens mapped to the user they belong to.
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: OrderedDict[str, tuple[float, UserRead]] = OrderedDict()
+        self.tokens_by_user: Dict[UUID, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # ORM events may fire from the threadpool as well as the event loop.
+        self.lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[UserRead]:
+        with self.lock:
+            entry = self.entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, principal = entry
+            if expires_at <= time.monotonic():
+                self._remove(token)
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(token)
+            self.hits += 1
+            return principal
+
+    def peek(self, token: str) -> Optional[UserRead]:
+        # Same lookup as get() but without touching counters or LRU order.
+        with self.lock:
+            entry = self.entries.get(token)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def put(self, token: str, principal: UserRead, token_exp: Optional[float]) -> None:
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+
+        # Never outlive the token itself: a cached entry must not keep an
+        # expired JWT usable.
+        ttl = self.ttl
+        if token_exp is not None:
+            ttl = min(ttl, token_exp - time.time())
+        if ttl <= 0:
+            return
+
+        with self.lock:
+            self._remove(token)
+            self.entries[token] = (time.monotonic() + ttl, principal)
+            self.tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self.entries) > self.max_entries:
+                oldest = next(iter(self.entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: UUID) -> None:
+        with self.lock:
+            tokens = self.tokens_by_user.pop(user_id, set())
+            for token in tokens:
+                self.entries.pop(token, None)
+            self.invalidations += len(tokens)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.tokens_by_user.clear()
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _remove(self, token: str) -> None:
+        entry = self.entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self.tokens_by_user.get(entry[1].id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self.tokens_by_user[entry[1].id]
+
+
+principal_cache = PrincipalCache(
+    max_entries=settings.auth_cache_size, ttl=settings.auth_cache_ttl
+)
+
+
+# Only changes made through the ORM in this process are seen here; other
+# workers fall back to the TTL, so keep it short.
+@event.listens_for(User, "after_update")
+def _invalidate_updated_principal(mapper, connection, target: User) -> None:
+    # Fires for every dirty User, including ones that only gained a message
+    # or chat through a relationship; only column changes matter here.
+    session = object_session(target)
+    if session is None or session.is_modified(target, include_collections=False):
+        principal_cache.invalidate_user(target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_principal(mapper, connection, target: User) -> None:
+    principal_cache.invalidate_user(target.id)
@@ -0,0 +1,30 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.database import track_queries
+
+
+class QueryCountMiddleware:
+    # Reports the statements a request ran in an X-DB-Query-Count header.
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries, token = track_queries()
+
+        async def send_with_count(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-db-query-count", str(queries.count).encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            if token is not None:
+                token.var.reset(token)
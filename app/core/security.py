@@ -3,7 +3,8 @@ from typing import Any, Optional
 
 from fastapi import HTTPException, status
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+
+from app.core.hashing import password_hasher
 
 
 class JWTService:
@@ -16,13 +17,13 @@ class JWTService:
         self.secret_key = secret_key
         self.algorithm = algorithm
         self.access_token_expire_minutes = access_token_expire_minutes
-        self.pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+        self.password_hasher = password_hasher
 
-    def get_password_hash(self, password: str) -> str:
-        return self.pwd_context.hash(password)
+    async def get_password_hash(self, password: str) -> str:
+        return await self.password_hasher.hash(password)
 
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return self.pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.password_hasher.verify(plain_password, hashed_password)
 
     def create_access_token(
         self,
@@ -2,26 +2,52 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
 from .api import api_router
+from .api.routes.metrics_router import router as metrics_router
 from .api.routes.ws_router import router as ws_router
+from .core.admission import AdmissionMiddleware
+from .core.body_limit import BodyLimitMiddleware
+from .core.config import settings
 from .core.database import engine
+from .core.hashing import password_hasher
+from .core.metrics import MetricsMiddleware
+from .core.query_counter import QueryCountMiddleware
+from .services.preview_service import preview_service
+from .services.purge_service import purge_service
+from .services.ws_service import ws_service
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await ws_service.start()
+    await preview_service.start()
+    await purge_service.start()
     yield
+    await purge_service.stop()
+    await preview_service.stop()
+    await ws_service.stop()
+    password_hasher.shutdown()
     await engine.dispose()
     print("Database connection pool closed")
 
 
 app = FastAPI(lifespan=lifespan)
 
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
-
 app.include_router(api_router, prefix="/api")
 app.include_router(ws_router)
+if settings.metrics_enabled:
+    app.include_router(metrics_router)
+# Added before CORS so that CORS wraps it and shed responses still carry
+# the CORS headers browsers need to read them.
+app.add_middleware(AdmissionMiddleware)
+if settings.db_query_count_header:
+    app.add_middleware(QueryCountMiddleware)
+# Oversized bodies are refused before they take an admission slot.
+app.add_middleware(BodyLimitMiddleware)
+# Outside admission control, so shed requests are measured too.
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["https://chatify-front-lut6.onrender.com", "http://localhost:3000"],
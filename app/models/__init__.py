@@ -1,6 +1,7 @@
-__all__ = ["User", "Chat", "Message", "File"]
+__all__ = ["User", "Chat", "Message", "File", "Blob", "MessageTombstone"]
 
 from .chat_model import Chat
-from .message_model import Message
+from .message_model import Message, MessageTombstone
 from .user_model import User
 from .file_model import File
+from .blob_model import Blob
@@ -0,0 +1,17 @@
+from sqlalchemy import Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base_model import Base
+from .timestamp_model import TimestampMixin
+
+
+class Blob(Base, TimestampMixin):
+    __tablename__ = "blobs"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+
+    path: Mapped[str] = mapped_column(String, nullable=False)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    ref_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
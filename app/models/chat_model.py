@@ -1,8 +1,21 @@
 import uuid
+from datetime import datetime
+from typing import Optional
 
-from sqlalchemy import Column, ForeignKey, Table
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Table,
+    text,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.sql import func
 
 from .base_model import Base
 from .timestamp_model import TimestampMixin
@@ -22,11 +35,39 @@ chat_users = Table(
         ForeignKey("users.id", ondelete="CASCADE"),
         primary_key=True,
     ),
+    # Read state of this member. unread_count is kept up to date on every
+    # send, delete and mark-read, so chat lists never count messages.
+    Column("last_read_message_id", UUID(as_uuid=True)),
+    Column("last_read_at", DateTime(timezone=True)),
+    Column("unread_count", Integer, server_default="0", nullable=False),
+    Index("ix_chat_users_user_id", "user_id"),
 )
 
+LAST_MESSAGE_PREVIEW_LENGTH = 255
+
 
 class Chat(Base, TimestampMixin):
     __tablename__ = "chats"
+    __table_args__ = (
+        Index(
+            "ix_chats_last_activity_at_id",
+            "last_activity_at",
+            "id",
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+        Index(
+            "ix_chats_deleted_at",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+        ),
+        Index(
+            "ix_chats_direct_pair",
+            "direct_user_a",
+            "direct_user_b",
+            unique=True,
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4
@@ -38,8 +79,33 @@ class Chat(Base, TimestampMixin):
         nullable=False,
     )
 
+    # Members of a one-to-one chat in canonical (lower, higher) order, so the
+    # pair can be found, and kept unique, with a single index probe.
+    direct_user_a: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE")
+    )
+    direct_user_b: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE")
+    )
+
+    last_message_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True))
+    last_message_preview: Mapped[Optional[str]] = mapped_column(
+        String(LAST_MESSAGE_PREVIEW_LENGTH)
+    )
+    last_message_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    last_message_author_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True)
+    )
+    last_activity_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    # Bumped for every message created, edited or deleted in the chat.
+    last_seq: Mapped[int] = mapped_column(
+        BigInteger, server_default="0", nullable=False
+    )
+
     creator = relationship("User", foreign_keys=[creator_id])
     users = relationship("User", secondary=chat_users, back_populates="chats")
     messages = relationship(
-        "Message", back_populates="chat", cascade="all, delete", lazy="selectin"
+        "Message", back_populates="chat", cascade="all, delete", passive_deletes=True
     )
@@ -1,6 +1,7 @@
 import uuid
+from typing import Optional
 
-from sqlalchemy import Integer, String
+from sqlalchemy import ForeignKey, Index, Integer, String, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -10,6 +11,14 @@ from .timestamp_model import TimestampMixin
 
 class File(Base, TimestampMixin):
     __tablename__ = "files"
+    __table_args__ = (
+        Index(
+            "ix_files_deleted_at",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+        ),
+        Index("ix_files_uploader_id_sha256", "uploader_id", "sha256"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4
@@ -18,3 +27,18 @@ class File(Base, TimestampMixin):
     filename: Mapped[str] = mapped_column(String, nullable=False)
     path: Mapped[str] = mapped_column(String, nullable=False)
     size: Mapped[int] = mapped_column(Integer, nullable=False)
+    sha256: Mapped[Optional[str]] = mapped_column(
+        String(64), ForeignKey("blobs.sha256"), index=True
+    )
+
+    mime_type: Mapped[Optional[str]] = mapped_column(String(127))
+    # Only the uploader may create further files from the same content by
+    # hash; knowing a digest is not proof of holding the bytes.
+    uploader_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL")
+    )
+
+    # Filled in by the preview workers once the upload is committed.
+    width: Mapped[Optional[int]] = mapped_column(Integer)
+    height: Mapped[Optional[int]] = mapped_column(Integer)
+    thumbnail_path: Mapped[Optional[str]] = mapped_column(String)
@@ -1,8 +1,20 @@
 import uuid
+from datetime import datetime
 
-from sqlalchemy import Column, ForeignKey, Table, Text
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Computed,
+    DateTime,
+    ForeignKey,
+    Index,
+    Table,
+    Text,
+    text,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.sql import func
 
 from .base_model import Base
 from .timestamp_model import TimestampMixin
@@ -22,11 +34,35 @@ message_files = Table(
         ForeignKey("files.id", ondelete="CASCADE"),
         primary_key=True,
     ),
+    Index("ix_message_files_file_id", "file_id"),
 )
 
 
 class Message(Base, TimestampMixin):
     __tablename__ = "messages"
+    # Live reads only ever want rows that are not deleted, so their indexes
+    # leave tombstones out; the purge worker finds those by deleted_at.
+    __table_args__ = (
+        Index(
+            "ix_messages_chat_id_created_at_id",
+            "chat_id",
+            "created_at",
+            "id",
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+        Index(
+            "ix_messages_search_vector",
+            "search_vector",
+            postgresql_using="gin",
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+        Index("ix_messages_chat_id_seq", "chat_id", "seq", unique=True),
+        Index(
+            "ix_messages_deleted_at",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4
@@ -41,11 +77,39 @@ class Message(Base, TimestampMixin):
     )
 
     content: Mapped[str] = mapped_column(Text, nullable=False)
+    # Chat sequence number of the latest change to this message.
+    seq: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+    # Maintained by Postgres on every write. The "simple" configuration does
+    # no stemming or stop words, so it treats every language the same.
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed("to_tsvector('simple'::regconfig, content)", persisted=True),
+        deferred=True,
+    )
 
     chat = relationship("Chat", back_populates="messages")
     author = relationship("User", back_populates="messages")
     files = relationship(
         "File",
         secondary=message_files,
-        cascade="all, delete",
+        secondaryjoin="and_(File.id == message_files.c.file_id, "
+        "File.deleted_at.is_(None))",
+        order_by="(File.created_at, File.id)",
+    )
+
+
+class MessageTombstone(Base):
+    # Left behind by deleted messages so that delta sync can report them.
+    __tablename__ = "message_tombstones"
+
+    chat_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("chats.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    seq: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    message_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
     )
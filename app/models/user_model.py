@@ -1,7 +1,7 @@
 import uuid
 from typing import Optional
 
-from sqlalchemy import String
+from sqlalchemy import Index, String, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -12,6 +12,20 @@ from .timestamp_model import TimestampMixin
 
 class User(Base, TimestampMixin):
     __tablename__ = "users"
+    # Trigram indexes serve both the prefix (LIKE 'abc%') and the fuzzy (%)
+    # lookups of the user directory.
+    __table_args__ = (
+        Index(
+            "ix_users_nickname_trgm",
+            text("lower(nickname) gin_trgm_ops"),
+            postgresql_using="gin",
+        ),
+        Index(
+            "ix_users_email_trgm",
+            text("lower(email) gin_trgm_ops"),
+            postgresql_using="gin",
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -1,4 +1,5 @@
 import uuid
+from datetime import datetime
 from typing import List, Optional
 
 from pydantic import Field
@@ -16,6 +17,30 @@ class ChatRead(BaseModel):
     creator_id: uuid.UUID
     users: List[UserRead]
     last_message: Optional[str] = None
+    last_message_id: Optional[uuid.UUID] = None
+    last_message_at: Optional[datetime] = None
+    last_message_author_id: Optional[uuid.UUID] = None
+    last_activity_at: Optional[datetime] = None
+    last_read_message_id: Optional[uuid.UUID] = None
+    unread_count: int = 0
 
     class Config:
         from_attributes = True
+
+
+class ChatMarkRead(BaseModel):
+    message_id: Optional[uuid.UUID] = Field(
+        None, description="Defaults to the latest message of the chat"
+    )
+
+
+class ChatReadState(BaseModel):
+    chat_id: uuid.UUID
+    last_read_message_id: Optional[uuid.UUID] = None
+    last_read_at: Optional[datetime] = None
+    unread_count: int
+
+
+class ChatPage(BaseModel):
+    items: List[ChatRead]
+    next_cursor: Optional[str] = None
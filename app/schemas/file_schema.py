@@ -1,6 +1,7 @@
 import uuid
+from typing import Optional
 
-from pydantic import BaseModel, field_validator
+from pydantic import AliasChoices, BaseModel, Field, ValidationInfo, field_validator
 
 BASE_URL = "http://localhost:8000"
 
@@ -11,16 +12,35 @@ class FileBase(BaseModel):
     size: int
 
 
+class FileByHash(BaseModel):
+    sha256: str = Field(..., pattern="^[0-9a-fA-F]{64}$")
+    filename: str = Field(..., min_length=1)
+
+
 class FileRead(BaseModel):
     id: uuid.UUID
     filename: str
     path: str
+    mime_type: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    thumbnail_url: Optional[str] = Field(
+        None, validation_alias=AliasChoices("thumbnail_path", "thumbnail_url")
+    )
 
     @field_validator("path", mode="before")
-    def build_full_url(cls, path: str) -> str:
-        if not path.startswith("http"):
-            return f"{BASE_URL}/{path.lstrip('/')}"
-        return path
+    def build_full_url(cls, path: str, info: ValidationInfo) -> str:
+        # Files are served by id through the attachments endpoint, never by
+        # their location on disk.
+        return f"{BASE_URL}/api/files/{info.data['id']}/content"
+
+    @field_validator("thumbnail_url", mode="before")
+    def build_thumbnail_url(
+        cls, thumbnail_path: Optional[str], info: ValidationInfo
+    ) -> Optional[str]:
+        if not thumbnail_path:
+            return None
+        return f"{BASE_URL}/api/files/{info.data['id']}/thumbnail"
 
     class Config:
         from_attributes = True
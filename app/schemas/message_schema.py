@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import Field
 
@@ -29,6 +29,7 @@ class MessageRead(MessageBase):
     id: uuid.UUID
     chat_id: uuid.UUID
     created_at: datetime
+    seq: Optional[int] = None
     author: Author
     files: Optional[List[FileRead]] = []
 
@@ -36,5 +37,41 @@ class MessageRead(MessageBase):
         from_attributes = True
 
 
+class MessagePage(BaseModel):
+    items: List[MessageRead]
+    next_cursor: Optional[str] = None
+
+
+class MessageSearchHit(MessageRead):
+    rank: float
+    snippet: str
+
+
+class MessageSearchPage(BaseModel):
+    items: List[MessageSearchHit]
+    next_cursor: Optional[str] = None
+
+
+class MessageSyncRequest(BaseModel):
+    chats: Dict[uuid.UUID, int] = Field(
+        ..., max_length=500, description="Last seq the client has, per chat"
+    )
+    limit: int = Field(100, ge=1, le=500, description="Changes per chat")
+
+
+class SyncedChat(BaseModel):
+    chat_id: uuid.UUID
+    last_seq: int
+    next_seq: int
+    has_more: bool
+    messages: List[MessageRead]
+    deleted_ids: List[uuid.UUID]
+
+
+class MessageSyncResponse(BaseModel):
+    chats: List[SyncedChat]
+    removed_chat_ids: List[uuid.UUID]
+
+
 class MessageUpdate(BaseModel):
     content: str
@@ -0,0 +1,88 @@
+import uuid
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from app.core.encoding import dumps
+
+from .file_schema import BASE_URL
+
+# Single-pass JSON for the hot list endpoints: query rows go straight to the
+# dicts their response models would produce, skipping model validation on the
+# way in and again on the way out. Keys must stay in step with FileRead,
+# MessageRead, ChatRead and UserRead.
+
+
+def file_json(
+    file_id: uuid.UUID,
+    filename: str,
+    mime_type: Optional[str],
+    width: Optional[int],
+    height: Optional[int],
+    thumbnail_path: Optional[str],
+) -> dict[str, Any]:
+    url = f"{BASE_URL}/api/files/{file_id}"
+    return {
+        "id": file_id,
+        "filename": filename,
+        "path": f"{url}/content",
+        "mime_type": mime_type,
+        "width": width,
+        "height": height,
+        "thumbnail_url": f"{url}/thumbnail" if thumbnail_path else None,
+    }
+
+
+def message_json(
+    message_id: uuid.UUID,
+    chat_id: uuid.UUID,
+    content: Optional[str],
+    created_at: datetime,
+    seq: int,
+    author_id: uuid.UUID,
+    author_nickname: Optional[str],
+    files: list[dict[str, Any]],
+) -> dict[str, Any]:
+    return {
+        "content": content,
+        "fileIds": None,
+        "id": message_id,
+        "chatId": chat_id,
+        "createdAt": created_at,
+        "seq": seq,
+        "author": {"id": author_id, "nickname": author_nickname},
+        "files": files,
+    }
+
+
+def user_json(user_id: uuid.UUID, nickname: str, email: str) -> dict[str, Any]:
+    return {"id": user_id, "nickname": nickname, "email": email}
+
+
+def chat_json(
+    chat_id: uuid.UUID,
+    creator_id: uuid.UUID,
+    last_message: Optional[str],
+    last_message_id: Optional[uuid.UUID],
+    last_message_at: Optional[datetime],
+    last_message_author_id: Optional[uuid.UUID],
+    last_activity_at: datetime,
+    last_read_message_id: Optional[uuid.UUID],
+    unread_count: int,
+    users: list[dict[str, Any]],
+) -> dict[str, Any]:
+    return {
+        "id": chat_id,
+        "creatorId": creator_id,
+        "users": users,
+        "lastMessage": last_message,
+        "lastMessageId": last_message_id,
+        "lastMessageAt": last_message_at,
+        "lastMessageAuthorId": last_message_author_id,
+        "lastActivityAt": last_activity_at,
+        "lastReadMessageId": last_read_message_id,
+        "unreadCount": unread_count,
+    }
+
+
+def page_json(items: Sequence[dict[str, Any]], next_cursor: Optional[str]) -> bytes:
+    return dumps({"items": items, "nextCursor": next_cursor})
@@ -0,0 +1,54 @@
+from typing import Dict, Optional
+
+from .base_schema import BaseModel
+
+
+class PoolStats(BaseModel):
+    profile: str
+    pool_size: int
+    max_overflow: int
+    max_connections: Optional[int] = None
+    checked_out: int
+    idle: int
+    overflow: int
+    connects: int
+    connect_avg_ms: float
+    connect_max_ms: float
+    checkouts: int
+    wait_avg_ms: float
+    wait_max_ms: float
+
+
+class PrincipalCacheStats(BaseModel):
+    entries: int
+    max_entries: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    hit_ratio: float
+    evictions: int
+    invalidations: int
+
+
+class PasswordHashingStats(BaseModel):
+    workers: int
+    max_pending: int
+    pending: int
+    running: int
+    completed: int
+    rejected: int
+    wait_avg_ms: float
+    wait_max_ms: float
+    hash_avg_ms: float
+    hash_max_ms: float
+
+
+class AdmissionStats(BaseModel):
+    enabled: bool
+    max_in_flight: int
+    in_flight: int
+    in_flight_peak: int
+    admitted: int
+    rejected_overload: int
+    rejected_rate: Dict[str, int]
+    tracked_callers: int
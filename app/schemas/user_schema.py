@@ -1,7 +1,10 @@
+from typing import List, Optional
 from uuid import UUID
 
 from pydantic import BaseModel
 
+from .base_schema import BaseModel as CamelModel
+
 
 class UserRead(BaseModel):
     id: UUID
@@ -10,3 +13,8 @@ class UserRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class UserPage(CamelModel):
+    items: List[UserRead]
+    next_cursor: Optional[str] = None
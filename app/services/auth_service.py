@@ -22,10 +22,11 @@ class AuthService:
                 detail="User with this email or nickname already exists",
             )
 
+        password_hash = await self.jwt_service.get_password_hash(data.password)
         user = User(
             email=data.email,
             nickname=data.nickname,
-            password_hash=self.jwt_service.get_password_hash(data.password),
+            password_hash=password_hash,
         )
         session.add(user)
         await session.commit()
@@ -42,7 +43,7 @@ class AuthService:
         )
         user = result.scalar_one_or_none()
 
-        if not user or not self.jwt_service.verify_password(
+        if not user or not await self.jwt_service.verify_password(
             data.password, user.password_hash
         ):
             raise HTTPException(
@@ -1,76 +1,86 @@
 import uuid
-from typing import List, Optional
+from datetime import datetime
+from typing import Iterable, Optional
 
 from fastapi import HTTPException, status
-from sqlalchemy import select
+from sqlalchemy import Select, func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.models.chat_model import Chat
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.chat_model import Chat, chat_users
+from app.models.message_model import Message
 from app.models.user_model import User
-from app.schemas.chat_schema import ChatRead
+from app.schemas import serializers
+from app.schemas.chat_schema import ChatPage, ChatRead, ChatReadState
 from app.schemas.user_schema import UserRead
 
 
 class ChatService:
     async def create_chat(
         self,
-        creator: User,
+        creator_id: uuid.UUID,
         receiver_id: uuid.UUID,
         session: AsyncSession,
     ) -> ChatRead:
-        if creator.id == receiver_id:
+        if creator_id == receiver_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Cannot create chat with yourself",
             )
 
-        receiver = await session.get(User, receiver_id)
-        if not receiver:
+        result = await session.execute(
+            select(func.count()).where(User.id.in_([creator_id, receiver_id]))
+        )
+        if result.scalar_one() != 2:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Receiver not found",
             )
 
+        # The unique pair index decides atomically whether this chat is new,
+        # so concurrent creates cannot both succeed.
+        user_a, user_b = sorted((creator_id, receiver_id))
         result = await session.execute(
-            select(Chat)
-            .options(selectinload(Chat.users))
-            .join(Chat.users)
-            .where(Chat.users.any(User.id == creator.id))
-            .where(Chat.users.any(User.id == receiver_id))
+            insert(Chat)
+            .values(
+                id=uuid.uuid4(),
+                creator_id=creator_id,
+                direct_user_a=user_a,
+                direct_user_b=user_b,
+            )
+            .on_conflict_do_nothing(
+                index_elements=[Chat.direct_user_a, Chat.direct_user_b],
+                index_where=Chat.deleted_at.is_(None),
+            )
+            .returning(Chat.id)
         )
-        existing_chat = result.scalar_one_or_none()
+        chat_id = result.scalar_one_or_none()
 
-        if existing_chat:
+        if not chat_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Chat already exists between these users",
             )
 
-        chat = Chat(
-            creator_id=creator.id,
-            users=[creator, receiver],
+        await session.execute(
+            insert(chat_users).values(
+                [
+                    {"chat_id": chat_id, "user_id": creator_id},
+                    {"chat_id": chat_id, "user_id": receiver_id},
+                ]
+            )
         )
-
-        session.add(chat)
         await session.commit()
-        await session.refresh(chat)
 
-        return ChatRead(
-            id=chat.id,
-            creator_id=chat.creator_id,
-            users=[UserRead.model_validate(u) for u in chat.users],
-            last_message=None,
-        )
+        return await self.get_chat(chat_id, session)
 
     async def get_chat(self, chat_id: uuid.UUID, session: AsyncSession) -> ChatRead:
         result = await session.execute(
             select(Chat)
-            .options(
-                selectinload(Chat.users),
-                selectinload(Chat.messages),
-            )
-            .where(Chat.id == chat_id)
+            .options(selectinload(Chat.users))
+            .where(Chat.id == chat_id, Chat.deleted_at.is_(None))
         )
         chat = result.scalar_one_or_none()
 
@@ -80,61 +90,237 @@ class ChatService:
                 detail="Chat not found",
             )
 
-        last_message = (
-            sorted(chat.messages, key=lambda m: m.created_at, reverse=True)[0].content
-            if chat.messages
-            else None
+        return self._to_read(chat)
+
+    async def get_user_chats(
+        self,
+        user_id: uuid.UUID,
+        session: AsyncSession,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> ChatPage:
+        query = select(
+            Chat, chat_users.c.unread_count, chat_users.c.last_read_message_id
+        ).options(selectinload(Chat.users))
+        result = await session.execute(
+            self._user_chats_query(query, user_id, cursor).limit(limit + 1)
         )
+        rows = list(result.all())
 
-        return ChatRead(
-            id=chat.id,
-            creator_id=chat.creator_id,
-            users=[UserRead.model_validate(u) for u in chat.users],
-            last_message=last_message,
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last_chat = rows[-1][0]
+            next_cursor = encode_cursor(last_chat.last_activity_at, last_chat.id)
+
+        return ChatPage(
+            items=[
+                self._to_read(
+                    chat,
+                    unread_count=unread_count,
+                    last_read_message_id=last_read_message_id,
+                )
+                for chat, unread_count, last_read_message_id in rows
+            ],
+            next_cursor=next_cursor,
         )
 
-    async def get_user_chats(
-        self, user_id: uuid.UUID, session: AsyncSession
-    ) -> List[ChatRead]:
+    async def get_user_chats_json(
+        self,
+        user_id: uuid.UUID,
+        session: AsyncSession,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> bytes:
+        query = select(
+            Chat.id,
+            Chat.creator_id,
+            Chat.last_message_preview,
+            Chat.last_message_id,
+            Chat.last_message_at,
+            Chat.last_message_author_id,
+            Chat.last_activity_at,
+            chat_users.c.last_read_message_id,
+            chat_users.c.unread_count,
+        )
         result = await session.execute(
-            select(Chat)
-            .options(
-                selectinload(Chat.users),
-                selectinload(Chat.messages),
+            self._user_chats_query(query, user_id, cursor).limit(limit + 1)
+        )
+        rows = list(result.tuples().all())
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][6], rows[-1][0])
+
+        members: dict[uuid.UUID, list[dict]] = {}
+        if rows:
+            result = await session.execute(
+                select(chat_users.c.chat_id, User.id, User.nickname, User.email)
+                .join(User, User.id == chat_users.c.user_id)
+                .where(chat_users.c.chat_id.in_([row[0] for row in rows]))
             )
-            .join(Chat.users)
-            .where(User.id == user_id)
+            for chat_id, *user_row in result.tuples():
+                members.setdefault(chat_id, []).append(serializers.user_json(*user_row))
+
+        return serializers.page_json(
+            [serializers.chat_json(*row, members.get(row[0], [])) for row in rows],
+            next_cursor,
         )
-        chats = result.scalars().unique().all()
-
-        chat_reads: List[ChatRead] = []
-        for chat in chats:
-            last_message = (
-                sorted(chat.messages, key=lambda m: m.created_at, reverse=True)[
-                    0
-                ].content
-                if chat.messages
-                else None
+
+    async def mark_read(
+        self,
+        chat_id: uuid.UUID,
+        user_id: uuid.UUID,
+        session: AsyncSession,
+        message_id: Optional[uuid.UUID] = None,
+    ) -> ChatReadState:
+        membership = (chat_users.c.chat_id == chat_id, chat_users.c.user_id == user_id)
+
+        if message_id:
+            result = await session.execute(
+                select(Message.id, Message.created_at).where(
+                    Message.id == message_id,
+                    Message.chat_id == chat_id,
+                    Message.deleted_at.is_(None),
+                )
             )
-            chat_reads.append(
-                ChatRead(
-                    id=chat.id,
-                    creator_id=chat.creator_id,
-                    users=[UserRead.model_validate(u) for u in chat.users],
-                    last_message=last_message,
+        else:
+            result = await session.execute(
+                select(Chat.last_message_id, Chat.last_message_at).where(
+                    Chat.id == chat_id,
+                    Chat.last_message_id.is_not(None),
+                    Chat.deleted_at.is_(None),
+                )
+            )
+        target = result.first()
+
+        if target:
+            read_id, read_at = target
+            # The member row is locked before counting. A send that commits
+            # while we wait for the lock is then seen by the count, which as
+            # a statement of its own reads a fresh snapshot; a later send
+            # waits for us and increments on top.
+            result = await session.execute(
+                select(chat_users.c.last_read_at, chat_users.c.last_read_message_id)
+                .where(*membership)
+                .with_for_update()
+            )
+            pointer = result.first()
+            # The pointer only moves forward.
+            if pointer and (
+                pointer.last_read_at is None
+                or (pointer.last_read_at, pointer.last_read_message_id)
+                < (read_at, read_id)
+            ):
+                # A range over ix_messages_chat_id_created_at_id.
+                remaining = await session.scalar(
+                    select(func.count())
+                    .select_from(Message)
+                    .where(
+                        Message.chat_id == chat_id,
+                        Message.deleted_at.is_(None),
+                        tuple_(Message.created_at, Message.id)
+                        > tuple_(read_at, read_id),
+                    )
+                )
+                await session.execute(
+                    update(chat_users)
+                    .where(*membership)
+                    .values(
+                        last_read_message_id=read_id,
+                        last_read_at=read_at,
+                        unread_count=remaining,
+                    )
                 )
+        elif message_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Message not found",
             )
 
-        return chat_reads
+        result = await session.execute(
+            select(
+                chat_users.c.last_read_message_id,
+                chat_users.c.last_read_at,
+                chat_users.c.unread_count,
+            ).where(*membership)
+        )
+        state = result.first()
+        if not state:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Chat not found",
+            )
+        await session.commit()
+
+        return ChatReadState(
+            chat_id=chat_id,
+            last_read_message_id=state.last_read_message_id,
+            last_read_at=state.last_read_at,
+            unread_count=state.unread_count,
+        )
+
+    async def get_member_chat_ids(
+        self,
+        user_id: uuid.UUID,
+        session: AsyncSession,
+        chat_ids: Optional[Iterable[uuid.UUID]] = None,
+    ) -> set[uuid.UUID]:
+        query = (
+            select(chat_users.c.chat_id)
+            .join(Chat, Chat.id == chat_users.c.chat_id)
+            .where(chat_users.c.user_id == user_id, Chat.deleted_at.is_(None))
+        )
+        if chat_ids is not None:
+            query = query.where(chat_users.c.chat_id.in_(list(chat_ids)))
+        result = await session.execute(query)
+        return set(result.scalars().all())
 
     async def delete_chat(self, chat_id: uuid.UUID, session: AsyncSession):
         chat = await session.get(Chat, chat_id)
-        if not chat:
+        if not chat or chat.deleted_at:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Chat not found",
             )
 
-        await session.delete(chat)
+        # The purge worker removes the messages and then the chat itself.
+        chat.deleted_at = func.now()
         await session.commit()
         return {"detail": "Chat deleted"}
+
+    @staticmethod
+    def _user_chats_query(
+        query: Select, user_id: uuid.UUID, cursor: Optional[str]
+    ) -> Select:
+        query = (
+            query.join(chat_users, chat_users.c.chat_id == Chat.id)
+            .where(chat_users.c.user_id == user_id, Chat.deleted_at.is_(None))
+            .order_by(Chat.last_activity_at.desc(), Chat.id.desc())
+        )
+        if cursor:
+            query = query.where(
+                tuple_(Chat.last_activity_at, Chat.id)
+                < decode_cursor(cursor, datetime.fromisoformat, uuid.UUID)
+            )
+        return query
+
+    @staticmethod
+    def _to_read(
+        chat: Chat,
+        unread_count: int = 0,
+        last_read_message_id: Optional[uuid.UUID] = None,
+    ) -> ChatRead:
+        return ChatRead(
+            id=chat.id,
+            creator_id=chat.creator_id,
+            users=[UserRead.model_validate(u) for u in chat.users],
+            last_message=chat.last_message_preview,
+            last_message_id=chat.last_message_id,
+            last_message_at=chat.last_message_at,
+            last_message_author_id=chat.last_message_author_id,
+            last_activity_at=chat.last_activity_at,
+            last_read_message_id=last_read_message_id,
+            unread_count=unread_count,
+        )
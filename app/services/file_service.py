@@ -1,12 +1,168 @@
+import asyncio
+import hashlib
+import mimetypes
 import os
+import threading
+import time
 import uuid
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, BinaryIO, Iterable, NamedTuple, Optional
 
 from fastapi import HTTPException, UploadFile, status
-from sqlalchemy import select
+from sqlalchemy import delete, exists, func, or_, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import upload_bytes, upload_duration, upload_size
+from app.models.blob_model import Blob
+from app.models.chat_model import chat_users
 from app.models.file_model import File
+from app.models.message_model import Message, message_files
 from app.schemas.file_schema import FileRead
+from app.services.preview_service import preview_service
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Shared by every FileService so the process as a whole never has more than
+# this many uploads copying to disk at once.
+upload_slots = asyncio.Semaphore(settings.upload_max_concurrency)
+
+
+class FileTooLarge(Exception):
+    pass
+
+
+class UploadStopped(Exception):
+    pass
+
+
+class StoredBlob(NamedTuple):
+    sha256: str
+    path: str
+    size: int
+    # The upload the blob was hashed from, if any; see restore_blobs.
+    source: Optional[BinaryIO] = None
+
+
+def read_chunks(source: BinaryIO, stop: Optional[threading.Event]):
+    source.seek(0)
+    while chunk := source.read(UPLOAD_CHUNK_SIZE):
+        if stop is not None and stop.is_set():
+            raise UploadStopped()
+        yield chunk
+
+
+def hash_upload(
+    source: BinaryIO, max_bytes: int, stop: Optional[threading.Event] = None
+) -> tuple[int, str]:
+    digest = hashlib.sha256()
+    size = 0
+
+    for chunk in read_chunks(source, stop):
+        size += len(chunk)
+        if size > max_bytes:
+            raise FileTooLarge()
+        digest.update(chunk)
+
+    return size, digest.hexdigest()
+
+
+def copy_upload(
+    source: BinaryIO,
+    temp_path: str,
+    final_path: str,
+    stop: Optional[threading.Event] = None,
+) -> None:
+    try:
+        with open(temp_path, "wb") as target:
+            for chunk in read_chunks(source, stop):
+                target.write(chunk)
+        os.replace(temp_path, final_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def store_blob(
+    source: BinaryIO,
+    upload_dir: str,
+    max_bytes: int,
+    stop: Optional[threading.Event] = None,
+) -> StoredBlob:
+    # Hash first: content we already hold is never written a second time.
+    # Setting stop abandons the upload at the next chunk.
+    size, sha256 = hash_upload(source, max_bytes, stop)
+    path = os.path.join(upload_dir, "blobs", sha256[:2], sha256)
+
+    if not os.path.exists(path):
+        write_blob(source, path, stop)
+
+    return StoredBlob(sha256=sha256, path=path, size=size, source=source)
+
+
+def write_blob(
+    source: BinaryIO, path: str, stop: Optional[threading.Event] = None
+) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    copy_upload(source, f"{path}.{uuid.uuid4()}.part", path, stop)
+
+
+def restore_blobs(blobs: Iterable[StoredBlob]) -> list[StoredBlob]:
+    # A purge may have removed a blob between store_blob finding it on disk
+    # and the caller locking its row. Writes those back from their upload
+    # and returns the ones that have no upload to come from.
+    lost = []
+    for stored in blobs:
+        if os.path.exists(stored.path):
+            continue
+        if stored.source is None:
+            lost.append(stored)
+        else:
+            write_blob(stored.source, stored.path)
+    return lost
+
+
+def move_aside(paths: Iterable[str]) -> list[tuple[str, str]]:
+    # Takes files out of place before the transaction releasing them commits,
+    # so nobody can retain a blob in between and still find it on disk.
+    moved = []
+    for path in dict.fromkeys(paths):
+        if os.path.exists(path):
+            aside = f"{path}.{uuid.uuid4()}.purged"
+            os.replace(path, aside)
+            moved.append((path, aside))
+    return moved
+
+
+def put_back(moved: Iterable[tuple[str, str]]) -> None:
+    for path, aside in moved:
+        os.replace(aside, path)
+
+
+def visible_to(user_id: uuid.UUID):
+    # Files are seen by whoever uploaded them, and by the members of any
+    # chat with a live message they are attached to.
+    return or_(
+        File.uploader_id == user_id,
+        exists().where(
+            message_files.c.file_id == File.id,
+            Message.id == message_files.c.message_id,
+            Message.deleted_at.is_(None),
+            chat_users.c.chat_id == Message.chat_id,
+            chat_users.c.user_id == user_id,
+        ),
+    )
+
+
+def remove_paths(paths: Iterable[str]) -> None:
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
 
 
 class FileService:
@@ -14,70 +170,322 @@ class FileService:
         self.upload_dir = upload_dir
         os.makedirs(self.upload_dir, exist_ok=True)
 
-    async def save_file(self, file: UploadFile, session: AsyncSession) -> FileRead:
+    async def save_file(
+        self, file: UploadFile, uploader_id: uuid.UUID, session: AsyncSession
+    ) -> FileRead:
+        async with self.stored_uploads([file], session) as [stored]:
+            [db_file] = await self.add_files(
+                [(file.filename or "", stored)], uploader_id, session
+            )
+            await session.commit()
+        await session.refresh(db_file)
+        preview_service.enqueue([db_file])
+
+        return FileRead.model_validate(db_file)
+
+    @asynccontextmanager
+    async def stored_uploads(
+        self, files: list[UploadFile], session: AsyncSession
+    ) -> AsyncIterator[list[StoredBlob]]:
+        # Stores the uploads concurrently for the body to add rows for. If
+        # anything fails before those rows are committed, the blobs nothing
+        # claims are removed again, so a failed request leaves no files.
+        written: list[StoredBlob] = []
+        try:
+            yield await self._store_uploads(files, written)
+        except BaseException:
+            await session.rollback()
+            await self.discard_blobs(written)
+            raise
+
+    async def _store_uploads(
+        self, files: list[UploadFile], written: list[StoredBlob]
+    ) -> list[StoredBlob]:
+        # The first failure cancels the rest, which stop at their next chunk.
+        stop = threading.Event()
+        try:
+            async with asyncio.TaskGroup() as group:
+                tasks = [
+                    group.create_task(self.store_upload(file, stop, written))
+                    for file in files
+                ]
+        except BaseExceptionGroup as errors:
+            raise errors.exceptions[0]
+        return [task.result() for task in tasks]
+
+    async def store_upload(
+        self,
+        file: UploadFile,
+        stop: Optional[threading.Event] = None,
+        written: Optional[list[StoredBlob]] = None,
+    ) -> StoredBlob:
+        # Whatever reaches the disk is also appended to written, even when
+        # the upload is cancelled after its copy has finished.
         if not file.filename:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid file name",
             )
 
-        file_ext = os.path.splitext(file.filename)[1]
-        unique_name = f"{uuid.uuid4()}{file_ext}"
-        file_path = os.path.join(self.upload_dir, unique_name)
-
+        started = time.perf_counter()
+        outcome = "error"
         try:
-            content = await file.read()
-            with open(file_path, "wb") as f:
-                f.write(content)
+            async with upload_slots:
+                stored = await self._store_blob(
+                    file, stop or threading.Event(), written
+                )
+            outcome = "stored"
+            upload_bytes.inc(amount=stored.size)
+            upload_size.observe(stored.size)
+            return stored
+        except FileTooLarge:
+            outcome = "too_large"
+            raise HTTPException(
+                status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+                detail="File is too large",
+            )
         except Exception:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Error saving file",
             )
+        finally:
+            upload_duration.observe(time.perf_counter() - started, outcome)
 
-        db_file = File(
-            filename=file.filename,
-            path=file_path,
-            size=os.path.getsize(file_path),
+    async def _store_blob(
+        self,
+        file: UploadFile,
+        stop: threading.Event,
+        written: Optional[list[StoredBlob]],
+    ) -> StoredBlob:
+        copy = asyncio.ensure_future(
+            run_in_threadpool(
+                store_blob, file.file, self.upload_dir, settings.upload_max_bytes, stop
+            )
         )
+        try:
+            await asyncio.shield(copy)
+        except asyncio.CancelledError:
+            # The thread cannot be cancelled: stop it and wait, so a blob it
+            # already wrote is not lost track of.
+            stop.set()
+            await asyncio.wait([copy])
+            if copy.exception() is None and written is not None:
+                written.append(copy.result())
+            raise
 
-        session.add(db_file)
+        if written is not None:
+            written.append(copy.result())
+        return copy.result()
+
+    async def discard_blobs(self, blobs: Iterable[StoredBlob]) -> None:
+        # Call with no transaction of the caller's holding blob rows. A
+        # placeholder row locks each hash, as a purge does, so an upload of
+        # the same content either sees its row or writes the file again.
+        paths = {b.sha256: b.path for b in blobs}
+        if not paths:
+            return
+
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                insert(Blob)
+                .values(
+                    [
+                        {"sha256": sha256, "path": path, "size": 0, "ref_count": 0}
+                        for sha256, path in sorted(paths.items())
+                    ]
+                )
+                .on_conflict_do_nothing()
+            )
+            result = await session.execute(
+                delete(Blob)
+                .where(Blob.sha256.in_(list(paths)), Blob.ref_count <= 0)
+                .returning(Blob.sha256)
+            )
+            await self.commit_and_remove(
+                session, [paths[sha256] for sha256 in result.scalars()]
+            )
+
+    async def commit_and_remove(self, session: AsyncSession, paths: list[str]):
+        # Moves the files aside while the transaction still holds the rows
+        # that released them, and only deletes them once it has committed.
+        moved = await run_in_threadpool(move_aside, paths)
+        try:
+            await session.commit()
+        except BaseException:
+            await run_in_threadpool(put_back, moved)
+            raise
+        await run_in_threadpool(remove_paths, [aside for _, aside in moved])
+
+    async def add_files(
+        self,
+        uploads: Iterable[tuple[str, StoredBlob]],
+        uploader_id: uuid.UUID,
+        session: AsyncSession,
+    ) -> list[File]:
+        # Adds File rows for already stored blobs without committing, so that
+        # callers can fold them into their own transaction.
+        uploads = list(uploads)
+        await self._retain_blobs([stored for _, stored in uploads], session)
+
+        db_files = [
+            File(
+                filename=filename,
+                path=stored.path,
+                size=stored.size,
+                sha256=stored.sha256,
+                mime_type=mimetypes.guess_type(filename)[0],
+                uploader_id=uploader_id,
+            )
+            for filename, stored in uploads
+        ]
+        session.add_all(db_files)
+        return db_files
+
+    async def save_file_by_hash(
+        self,
+        sha256: str,
+        filename: str,
+        uploader_id: uuid.UUID,
+        session: AsyncSession,
+    ) -> FileRead:
+        # Content someone else uploaded looks exactly like unknown content.
+        sha256 = sha256.lower()
+        result = await session.execute(
+            select(File.id)
+            .where(File.sha256 == sha256, File.uploader_id == uploader_id)
+            .limit(1)
+        )
+        blob = await session.get(Blob, sha256) if result.first() else None
+        if not blob:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Unknown content, upload the file instead",
+            )
+
+        stored = StoredBlob(sha256=blob.sha256, path=blob.path, size=blob.size)
+        [db_file] = await self.add_files([(filename, stored)], uploader_id, session)
         await session.commit()
         await session.refresh(db_file)
+        preview_service.enqueue([db_file])
 
         return FileRead.model_validate(db_file)
 
     async def get_file(self, file_id: uuid.UUID, session: AsyncSession) -> FileRead:
-        db_file = await session.get(File, file_id)
+        return FileRead.model_validate(await self.get_stored_file(file_id, session))
+
+    async def get_stored_file(
+        self,
+        file_id: uuid.UUID,
+        session: AsyncSession,
+        viewer_id: Optional[uuid.UUID] = None,
+    ) -> File:
+        statement = select(File).where(File.id == file_id, File.deleted_at.is_(None))
+        if viewer_id is not None:
+            statement = statement.where(visible_to(viewer_id))
+        db_file = await session.scalar(statement)
         if not db_file:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="File not found",
             )
-        return FileRead.model_validate(db_file)
+        return db_file
 
     async def list_files(self, session: AsyncSession) -> list[FileRead]:
-        result = await session.execute(select(File))
+        result = await session.execute(select(File).where(File.deleted_at.is_(None)))
         files = result.scalars().all()
         return [FileRead.model_validate(f) for f in files]
 
     async def delete_file(self, file_id: uuid.UUID, session: AsyncSession) -> dict:
-        db_file = await session.get(File, file_id)
-        if not db_file:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="File not found",
+        db_file = await self.get_stored_file(file_id, session)
+
+        # The purge worker releases the blob and removes it from disk.
+        db_file.deleted_at = func.now()
+        await session.commit()
+
+        return {"detail": "File deleted"}
+
+    async def release_files(
+        self, files: Iterable[File], session: AsyncSession
+    ) -> list[str]:
+        # Must run after the File rows are flushed away. Returns the disk
+        # paths that nothing references any more; move them aside before
+        # commit, while the released blob rows are still locked.
+        files = list(files)
+        orphaned = []
+        for f in files:
+            if not f.sha256:
+                orphaned.extend(path for path in (f.path, f.thumbnail_path) if path)
+        counts = Counter(f.sha256 for f in files if f.sha256)
+        if not counts:
+            return orphaned
+
+        for sha256, count in counts.items():
+            await session.execute(
+                update(Blob)
+                .where(Blob.sha256 == sha256)
+                .values(ref_count=Blob.ref_count - count)
             )
 
-        try:
-            if os.path.exists(db_file.path):
-                os.remove(db_file.path)
-        except Exception:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Error deleting file from disk",
+        result = await session.execute(
+            delete(Blob)
+            .where(Blob.sha256.in_(list(counts)), Blob.ref_count <= 0)
+            .returning(Blob.sha256, Blob.path)
+        )
+        for sha256, path in result.all():
+            orphaned.append(path)
+            orphaned.append(preview_service.thumbnail_path_for(sha256))
+
+        # Files uploaded before blobs existed keep their own copy next to the
+        # shared one; it goes once no row with the same content names it.
+        shas = list(counts)
+        own_paths = {
+            path
+            for f in files
+            if f.sha256
+            for path in (f.path, f.thumbnail_path)
+            if path
+        }
+        result = await session.execute(
+            union_all(
+                select(Blob.path).where(Blob.sha256.in_(shas)),
+                select(File.path).where(
+                    File.sha256.in_(shas), File.path.in_(own_paths)
+                ),
+                select(File.thumbnail_path).where(
+                    File.sha256.in_(shas), File.thumbnail_path.in_(own_paths)
+                ),
             )
+        )
+        orphaned.extend(own_paths - set(result.scalars().all()))
+        return orphaned
 
-        await session.delete(db_file)
-        await session.commit()
-        return {"detail": "File deleted"}
+    async def _retain_blobs(
+        self, blobs: Iterable[StoredBlob], session: AsyncSession
+    ) -> None:
+        blobs = list(blobs)
+        counts = Counter((b.sha256, b.path, b.size) for b in blobs)
+        if not counts:
+            return
+
+        # One statement for the whole batch; duplicates are folded first since
+        # ON CONFLICT cannot touch the same row twice.
+        statement = insert(Blob).values(
+            [
+                {"sha256": sha256, "path": path, "size": size, "ref_count": count}
+                for (sha256, path, size), count in counts.items()
+            ]
+        )
+        await session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[Blob.sha256],
+                set_={"ref_count": Blob.ref_count + statement.excluded.ref_count},
+            )
+        )
+
+        # The rows are locked from here on, so the files stay put.
+        if await run_in_threadpool(restore_blobs, blobs):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Unknown content, upload the file instead",
+            )
@@ -1,17 +1,54 @@
 import uuid
+from datetime import datetime
 from typing import Optional
 
 from fastapi import HTTPException, UploadFile, status
-from sqlalchemy import select
+from sqlalchemy import (
+    BigInteger,
+    Select,
+    Float,
+    and_,
+    case,
+    cast,
+    column,
+    func,
+    literal,
+    or_,
+    select,
+    true,
+    tuple_,
+    union_all,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.models.chat_model import Chat
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.chat_model import LAST_MESSAGE_PREVIEW_LENGTH, Chat, chat_users
 from app.models.file_model import File
-from app.models.message_model import Message
+from app.models.message_model import Message, MessageTombstone, message_files
 from app.models.user_model import User
-from app.schemas.message_schema import MessageCreate, MessageRead
-from app.services.file_service import FileService
+from app.schemas import serializers
+from app.schemas.message_schema import (
+    MessageCreate,
+    MessagePage,
+    MessageRead,
+    MessageSearchHit,
+    MessageSearchPage,
+    MessageSyncResponse,
+    SyncedChat,
+)
+from app.services.file_service import FileService, visible_to
+from app.services.preview_service import preview_service
+
+
+SEARCH_CONFIG = "simple"
+SEARCH_HEADLINE_OPTIONS = (
+    "StartSel=<mark>, StopSel=</mark>, MaxWords=24, MinWords=8, "
+    'MaxFragments=2, FragmentDelimiter=" … "'
+)
 
 
 class MessageService:
@@ -28,7 +65,7 @@ class MessageService:
         chat = await session.get(Chat, data.chat_id)
         user = await session.get(User, author_id)
 
-        if not chat or not user:
+        if not chat or chat.deleted_at or not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Chat or user not found",
@@ -40,50 +77,339 @@ class MessageService:
                 detail="Message must have content or files",
             )
 
-        message = Message(chat=chat, author=user, content=data.content or "")
+        # Disk writes run concurrently and the rows go out in one flush; a
+        # failure before the commit takes the written blobs with it.
+        async with self.file_service.stored_uploads(files or [], session) as stored:
+            attached: list[File] = []
+
+            if files:
+                attached.extend(
+                    await self.file_service.add_files(
+                        zip((file.filename or "" for file in files), stored),
+                        author_id,
+                        session,
+                    )
+                )
+
+            if data.file_ids:
+                # Files can be reused by whoever uploaded them, or forwarded
+                # from a chat the author is in. The share lock keeps the purge
+                # worker from expiring an unattached file while it is attached.
+                result = await session.execute(
+                    select(File)
+                    .where(
+                        File.id.in_(data.file_ids),
+                        File.deleted_at.is_(None),
+                        visible_to(author_id),
+                    )
+                    .with_for_update(read=True)
+                )
+                attached.extend(result.scalars().all())
+
+            message = Message(
+                chat=chat,
+                author=user,
+                content=data.content or "",
+                files=attached,
+                seq=await self._next_seq(chat.id, session),
+            )
+            session.add(message)
+            await session.flush()
+            self._set_last_message(chat, message)
+            await self._count_unread(message, session)
+            await session.commit()
+        preview_service.enqueue(attached)
+
+        return MessageRead.model_validate(message)
+
+    async def get_chat_messages(
+        self,
+        chat_id: uuid.UUID,
+        session: AsyncSession,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: int = 50,
+    ) -> MessagePage:
+        query = select(Message).options(
+            selectinload(Message.author),
+            selectinload(Message.files),
+        )
+        result = await session.execute(
+            self._history_query(query, chat_id, before, after).limit(limit + 1)
+        )
+        messages = list(result.scalars().all())
+
+        next_cursor = None
+        if len(messages) > limit:
+            messages = messages[:limit]
+            next_cursor = encode_cursor(messages[-1].created_at, messages[-1].id)
+
+        # Pages are always returned oldest first, whichever way we walked.
+        if not after:
+            messages.reverse()
+
+        return MessagePage(
+            items=[MessageRead.model_validate(m) for m in messages],
+            next_cursor=next_cursor,
+        )
+
+    async def get_chat_messages_json(
+        self,
+        chat_id: uuid.UUID,
+        session: AsyncSession,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: int = 50,
+    ) -> bytes:
+        # Same page as get_chat_messages, read as plain columns and encoded
+        # without building a model per message and per file.
+        query = select(
+            Message.id,
+            Message.chat_id,
+            Message.content,
+            Message.created_at,
+            Message.seq,
+            Message.author_id,
+            User.nickname,
+        ).join(User, User.id == Message.author_id)
+        result = await session.execute(
+            self._history_query(query, chat_id, before, after).limit(limit + 1)
+        )
+        rows = list(result.tuples().all())
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][3], rows[-1][0])
 
-        if files:
-            saved_files = []
-            for file in files:
-                saved = await self.file_service.save_file(file, session)
-                db_file = await session.get(File, saved.id)
-                saved_files.append(db_file)
-            message.files = saved_files
+        if not after:
+            rows.reverse()
 
-        if data.file_ids:
+        files: dict[uuid.UUID, list[dict]] = {}
+        if rows:
             result = await session.execute(
-                select(File).where(File.id.in_(data.file_ids))
+                select(
+                    message_files.c.message_id,
+                    File.id,
+                    File.filename,
+                    File.mime_type,
+                    File.width,
+                    File.height,
+                    File.thumbnail_path,
+                )
+                .join(File, File.id == message_files.c.file_id)
+                .where(
+                    message_files.c.message_id.in_([row[0] for row in rows]),
+                    File.deleted_at.is_(None),
+                )
+                .order_by(File.created_at, File.id)
             )
-            message.files.extend(result.scalars().all())
+            for message_id, *file_row in result.tuples():
+                files.setdefault(message_id, []).append(
+                    serializers.file_json(*file_row)
+                )
 
-        session.add(message)
-        await session.commit()
+        return serializers.page_json(
+            [serializers.message_json(*row, files.get(row[0], [])) for row in rows],
+            next_cursor,
+        )
+
+    async def search_messages(
+        self,
+        user_id: uuid.UUID,
+        text: str,
+        session: AsyncSession,
+        chat_id: Optional[uuid.UUID] = None,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+    ) -> MessageSearchPage:
+        query = func.websearch_to_tsquery(SEARCH_CONFIG, text)
+        rank = cast(func.ts_rank(Message.search_vector, query), Float)
+
+        # Matching and ranking only touch the GIN index and the ids; the
+        # rows and their highlighted snippets are built for one page only.
+        matches = (
+            select(Message.id.label("id"), rank.label("rank"))
+            .join(chat_users, chat_users.c.chat_id == Message.chat_id)
+            .where(chat_users.c.user_id == user_id)
+            .where(Message.search_vector.op("@@")(query))
+            .where(Message.deleted_at.is_(None))
+        )
+        if chat_id:
+            matches = matches.where(Message.chat_id == chat_id)
+        if cursor:
+            matches = matches.where(
+                tuple_(rank, Message.id) < decode_cursor(cursor, float, uuid.UUID)
+            )
+        page = (
+            matches.order_by(rank.desc(), Message.id.desc()).limit(limit + 1).subquery()
+        )
 
         result = await session.execute(
-            select(Message)
-            .options(
-                selectinload(Message.author),
-                selectinload(Message.files),
+            select(
+                Message,
+                page.c.rank,
+                func.ts_headline(
+                    SEARCH_CONFIG, Message.content, query, SEARCH_HEADLINE_OPTIONS
+                ),
             )
-            .where(Message.id == message.id)
+            .join(page, page.c.id == Message.id)
+            .options(selectinload(Message.author), selectinload(Message.files))
+            .order_by(page.c.rank.desc(), Message.id.desc())
         )
-        full_message = result.scalar_one()
+        rows = list(result.all())
 
-        return MessageRead.model_validate(full_message)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][1], rows[-1][0].id)
+
+        return MessageSearchPage(
+            items=[
+                self._search_hit(message, message_rank, snippet)
+                for message, message_rank, snippet in rows
+            ],
+            next_cursor=next_cursor,
+        )
+
+    async def sync_messages(
+        self,
+        user_id: uuid.UUID,
+        since: dict[uuid.UUID, int],
+        session: AsyncSession,
+        limit: int = 100,
+    ) -> MessageSyncResponse:
+        if not since:
+            return MessageSyncResponse(chats=[], removed_chat_ids=[])
+
+        requested = values(
+            column("chat_id", UUID(as_uuid=True)),
+            column("since", BigInteger),
+            name="requested",
+        ).data(list(since.items()))
 
-    async def get_chat_messages(
-        self, chat_id: uuid.UUID, session: AsyncSession
-    ) -> list[MessageRead]:
         result = await session.execute(
-            select(Message)
-            .options(
-                selectinload(Message.author),
-                selectinload(Message.files),
+            select(requested.c.chat_id, Chat.last_seq)
+            .join(
+                Chat,
+                and_(Chat.id == requested.c.chat_id, Chat.deleted_at.is_(None)),
+            )
+            .join(
+                chat_users,
+                and_(
+                    chat_users.c.chat_id == requested.c.chat_id,
+                    chat_users.c.user_id == user_id,
+                ),
+            )
+        )
+        last_seqs = dict(result.all())
+        changed = [
+            chat_id
+            for chat_id, last_seq in last_seqs.items()
+            if last_seq > since[chat_id]
+        ]
+        if not changed:
+            return MessageSyncResponse(
+                chats=[],
+                removed_chat_ids=[c for c in since if c not in last_seqs],
+            )
+
+        # Every requested chat in one round trip: each row of the VALUES list
+        # walks (chat_id, seq) on messages and tombstones from its own
+        # position, at most limit + 1 entries per chat. Soft-deleted messages
+        # report themselves; purged ones left a tombstone row behind.
+        requested = values(
+            column("chat_id", UUID(as_uuid=True)),
+            column("since", BigInteger),
+            name="requested",
+        ).data([(chat_id, since[chat_id]) for chat_id in changed])
+        changes = (
+            union_all(
+                select(
+                    Message.seq.label("seq"),
+                    Message.id.label("message_id"),
+                    Message.deleted_at.is_not(None).label("deleted"),
+                ).where(
+                    Message.chat_id == requested.c.chat_id,
+                    Message.seq > requested.c.since,
+                ),
+                select(
+                    MessageTombstone.seq,
+                    MessageTombstone.message_id,
+                    literal(True),
+                ).where(
+                    MessageTombstone.chat_id == requested.c.chat_id,
+                    MessageTombstone.seq > requested.c.since,
+                ),
+            )
+            .order_by("seq")
+            .limit(limit + 1)
+            .lateral("changes")
+        )
+        result = await session.execute(
+            select(
+                requested.c.chat_id,
+                changes.c.seq,
+                changes.c.message_id,
+                changes.c.deleted,
             )
-            .where(Message.chat_id == chat_id)
+            .select_from(requested)
+            .join(changes, true())
+            .order_by(requested.c.chat_id, changes.c.seq)
+        )
+
+        feeds: dict[uuid.UUID, list] = {chat_id: [] for chat_id in changed}
+        for chat_id, seq, message_id, deleted in result.all():
+            feeds[chat_id].append((seq, message_id, deleted))
+
+        message_ids = [
+            message_id
+            for feed in feeds.values()
+            for _, message_id, deleted in feed[:limit]
+            if not deleted
+        ]
+        messages: dict[uuid.UUID, Message] = {}
+        if message_ids:
+            result = await session.execute(
+                select(Message)
+                .options(selectinload(Message.author), selectinload(Message.files))
+                .where(Message.id.in_(message_ids))
+            )
+            messages = {m.id: m for m in result.scalars().all()}
+
+        chats = []
+        for chat_id, feed in feeds.items():
+            has_more = len(feed) > limit
+            feed = feed[:limit]
+            # A message edited after this batch was read carries a newer
+            # seq; it is skipped here and shows up in a later sync.
+            chats.append(
+                SyncedChat(
+                    chat_id=chat_id,
+                    last_seq=last_seqs[chat_id],
+                    next_seq=(
+                        feed[-1][0]
+                        if has_more
+                        else max([last_seqs[chat_id]] + [seq for seq, _, _ in feed])
+                    ),
+                    has_more=has_more,
+                    messages=[
+                        MessageRead.model_validate(messages[message_id])
+                        for seq, message_id, deleted in feed
+                        if not deleted
+                        and message_id in messages
+                        and messages[message_id].seq == seq
+                    ],
+                    deleted_ids=[
+                        message_id for _, message_id, deleted in feed if deleted
+                    ],
+                )
+            )
+
+        return MessageSyncResponse(
+            chats=chats,
+            removed_chat_ids=[c for c in since if c not in last_seqs],
         )
-        messages = result.scalars().all()
-        return [MessageRead.model_validate(m) for m in messages]
 
     async def update_message(
         self,
@@ -93,7 +419,7 @@ class MessageService:
         session: AsyncSession,
     ) -> MessageRead:
         message = await session.get(Message, message_id)
-        if not message:
+        if not message or message.deleted_at:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Message not found",
@@ -106,6 +432,22 @@ class MessageService:
             )
 
         message.content = content
+        result = await session.execute(
+            update(Chat)
+            .where(Chat.id == message.chat_id)
+            .values(
+                last_seq=Chat.last_seq + 1,
+                last_message_preview=case(
+                    (
+                        Chat.last_message_id == message.id,
+                        content[:LAST_MESSAGE_PREVIEW_LENGTH],
+                    ),
+                    else_=Chat.last_message_preview,
+                ),
+            )
+            .returning(Chat.last_seq)
+        )
+        message.seq = result.scalar_one()
         await session.commit()
 
         result = await session.execute(
@@ -124,7 +466,7 @@ class MessageService:
         self, message_id: uuid.UUID, author_id: uuid.UUID, session: AsyncSession
     ) -> dict:
         message = await session.get(Message, message_id)
-        if not message:
+        if not message or message.deleted_at:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Message not found",
@@ -136,6 +478,132 @@ class MessageService:
                 detail="You can delete only your own messages",
             )
 
-        await session.delete(message)
+        # Only a tombstone here: the row, its files and their blobs are
+        # removed later by the purge worker, off the request path.
+        message.seq = await self._next_seq(message.chat_id, session)
+        message.deleted_at = func.now()
+        await self._uncount_unread(message, session)
+        await session.flush()
+
+        chat = await session.get(Chat, message.chat_id)
+        if chat and chat.last_message_id == message.id:
+            result = await session.execute(
+                select(Message)
+                .where(Message.chat_id == chat.id, Message.deleted_at.is_(None))
+                .order_by(Message.created_at.desc(), Message.id.desc())
+                .limit(1)
+            )
+            previous = result.scalar_one_or_none()
+            if previous:
+                self._set_last_message(chat, previous, touch=False)
+            else:
+                self._clear_last_message(chat)
+
         await session.commit()
         return {"detail": "Message deleted"}
+
+    @staticmethod
+    def _history_query(
+        query: Select,
+        chat_id: uuid.UUID,
+        before: Optional[str],
+        after: Optional[str],
+    ) -> Select:
+        if before and after:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Use either before or after, not both",
+            )
+
+        query = query.where(Message.chat_id == chat_id, Message.deleted_at.is_(None))
+        position = tuple_(Message.created_at, Message.id)
+
+        if after:
+            return query.where(
+                position > decode_cursor(after, datetime.fromisoformat, uuid.UUID)
+            ).order_by(Message.created_at.asc(), Message.id.asc())
+
+        if before:
+            query = query.where(
+                position < decode_cursor(before, datetime.fromisoformat, uuid.UUID)
+            )
+        return query.order_by(Message.created_at.desc(), Message.id.desc())
+
+    @staticmethod
+    async def _next_seq(chat_id: uuid.UUID, session: AsyncSession) -> int:
+        # The chat row stays locked until commit, so within a chat sequence
+        # numbers become visible in the order they were handed out and a
+        # client that synced up to N can never miss a change below N.
+        result = await session.execute(
+            update(Chat)
+            .where(Chat.id == chat_id)
+            .values(last_seq=Chat.last_seq + 1)
+            .returning(Chat.last_seq)
+        )
+        return result.scalar_one()
+
+    @staticmethod
+    def _search_hit(message: Message, rank: float, snippet: str) -> MessageSearchHit:
+        # Built from the validated MessageRead fields: a dump would have to
+        # be validated a second time, and the URL fields do not survive that.
+        read = MessageRead.model_validate(message)
+        return MessageSearchHit.model_construct(
+            **{name: getattr(read, name) for name in MessageRead.model_fields},
+            rank=rank,
+            snippet=snippet,
+        )
+
+    @staticmethod
+    async def _count_unread(message: Message, session: AsyncSession) -> None:
+        # One statement for the whole chat: the author has now read up to
+        # their own message, every other member has one more unread.
+        is_author = chat_users.c.user_id == message.author_id
+        await session.execute(
+            update(chat_users)
+            .where(chat_users.c.chat_id == message.chat_id)
+            .values(
+                unread_count=case((is_author, 0), else_=chat_users.c.unread_count + 1),
+                last_read_message_id=case(
+                    (is_author, message.id),
+                    else_=chat_users.c.last_read_message_id,
+                ),
+                last_read_at=case(
+                    (is_author, message.created_at),
+                    else_=chat_users.c.last_read_at,
+                ),
+            )
+        )
+
+    @staticmethod
+    async def _uncount_unread(message: Message, session: AsyncSession) -> None:
+        # Only members who had not read the message yet counted it.
+        await session.execute(
+            update(chat_users)
+            .where(
+                chat_users.c.chat_id == message.chat_id,
+                chat_users.c.user_id != message.author_id,
+                chat_users.c.unread_count > 0,
+                or_(
+                    chat_users.c.last_read_at.is_(None),
+                    tuple_(chat_users.c.last_read_at, chat_users.c.last_read_message_id)
+                    < tuple_(message.created_at, message.id),
+                ),
+            )
+            .values(unread_count=chat_users.c.unread_count - 1)
+        )
+
+    @staticmethod
+    def _set_last_message(chat: Chat, message: Message, touch: bool = True) -> None:
+        chat.last_message_id = message.id
+        chat.last_message_preview = message.content[:LAST_MESSAGE_PREVIEW_LENGTH]
+        chat.last_message_at = message.created_at
+        chat.last_message_author_id = message.author_id
+        if touch:
+            chat.last_activity_at = message.created_at
+
+    @staticmethod
+    def _clear_last_message(chat: Chat) -> None:
+        chat.last_message_id = None
+        chat.last_message_preview = None
+        chat.last_message_at = None
+        chat.last_message_author_id = None
@@ -0,0 +1,100 @@
+import asyncio
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional
+
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.imaging import render_thumbnail
+from app.models.file_model import File
+
+
+class PreviewService:
+    def __init__(self, upload_dir: str = "uploads"):
+        self.upload_dir = upload_dir
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.preview_queue_size)
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.workers: list[asyncio.Task] = []
+
+    async def start(self):
+        self.executor = ProcessPoolExecutor(
+            max_workers=settings.preview_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self.workers = [
+            asyncio.create_task(self._work()) for _ in range(settings.preview_workers)
+        ]
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        self.workers = []
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def enqueue(self, files: Iterable[File]):
+        # Call only after the rows are committed: workers update them from
+        # their own sessions.
+        for db_file in files:
+            if db_file.thumbnail_path or not (db_file.mime_type or "").startswith(
+                "image/"
+            ):
+                continue
+            try:
+                self.queue.put_nowait(
+                    (db_file.id, db_file.path, self.thumbnail_path(db_file))
+                )
+            except asyncio.QueueFull:
+                print(f">>> Preview queue full, skipping file {db_file.id}")
+
+    def thumbnail_path(self, db_file: File) -> str:
+        # Keyed by content, so every File sharing a blob shares the thumbnail.
+        return self.thumbnail_path_for(db_file.sha256 or str(db_file.id))
+
+    def thumbnail_path_for(self, key: str) -> str:
+        return os.path.join(self.upload_dir, "thumbnails", key[:2], f"{key}.webp")
+
+    async def _work(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            file_id, source_path, thumbnail_path = await self.queue.get()
+            try:
+                await self._render(loop, file_id, source_path, thumbnail_path)
+            except Exception as e:
+                print(f">>> Error generating preview for file {file_id}: {e}")
+
+    async def _render(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        file_id: uuid.UUID,
+        source_path: str,
+        thumbnail_path: str,
+    ):
+        result = await loop.run_in_executor(
+            self.executor,
+            render_thumbnail,
+            source_path,
+            thumbnail_path,
+            settings.preview_max_size,
+        )
+        if result is None:
+            return
+
+        width, height, mime_type = result
+        values = {"width": width, "height": height, "thumbnail_path": thumbnail_path}
+        if mime_type:
+            values["mime_type"] = mime_type
+
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(File).where(File.id == file_id).values(**values)
+            )
+            await session.commit()
+
+
+preview_service = PreviewService()
@@ -0,0 +1,179 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy import and_, delete, exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.core.admission import admission_controller
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.chat_model import Chat
+from app.models.file_model import File
+from app.models.message_model import Message, MessageTombstone, message_files
+from app.services.file_service import FileService
+
+
+class PurgeService:
+    # Physically removes soft-deleted rows once they are older than the
+    # retention period. Work is split into short transactions that skip rows
+    # locked elsewhere, so several workers can run it side by side.
+    def __init__(self, file_service: FileService):
+        self.file_service = file_service
+        self.task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if settings.purge_interval > 0:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    async def purge(self) -> None:
+        cutoff = datetime.now(timezone.utc) - timedelta(
+            seconds=settings.purge_retention
+        )
+        steps: list[Callable[[AsyncSession, datetime], Awaitable[int]]] = [
+            self._purge_messages,
+            self._purge_files,
+            self._purge_unattached_files,
+            self._purge_chat_messages,
+            self._purge_chats,
+        ]
+
+        for step in steps:
+            for _ in range(settings.purge_max_batches):
+                # Yield to live traffic: whatever is left waits for the next
+                # quiet moment.
+                if admission_controller.in_flight >= settings.purge_busy_in_flight:
+                    return
+
+                async with AsyncSessionLocal() as session:
+                    purged = await step(session, cutoff)
+                if purged < settings.purge_batch_size:
+                    break
+                await asyncio.sleep(settings.purge_batch_pause)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.purge_interval)
+            try:
+                await self.purge()
+            except Exception as e:
+                print(f">>> Purge failed: {e}")
+
+    async def _purge_messages(self, session: AsyncSession, cutoff: datetime) -> int:
+        # Deleted messages turn into tombstone rows with the same seq, so
+        # delta sync keeps reporting them after the row is gone.
+        return await self._delete_messages(
+            session, Message.deleted_at < cutoff, keep_tombstones=True
+        )
+
+    async def _purge_chat_messages(
+        self, session: AsyncSession, cutoff: datetime
+    ) -> int:
+        deleted_chats = select(Chat.id).where(Chat.deleted_at < cutoff)
+        return await self._delete_messages(
+            session, Message.chat_id.in_(deleted_chats), keep_tombstones=False
+        )
+
+    async def _purge_chats(self, session: AsyncSession, cutoff: datetime) -> int:
+        # Only chats whose messages are all gone, so the cascade stays small.
+        chat_ids = (
+            select(Chat.id)
+            .where(
+                Chat.deleted_at < cutoff,
+                ~exists().where(Message.chat_id == Chat.id),
+            )
+            .limit(settings.purge_batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        result = await session.execute(
+            delete(Chat).where(Chat.id.in_(chat_ids)).returning(Chat.id)
+        )
+        purged = len(result.all())
+        await session.commit()
+        return purged
+
+    async def _purge_files(self, session: AsyncSession, cutoff: datetime) -> int:
+        return await self._delete_files(session, File.deleted_at < cutoff)
+
+    async def _purge_unattached_files(
+        self, session: AsyncSession, cutoff: datetime
+    ) -> int:
+        # Files created by hash or uploaded for a message that was never
+        # sent; without this they would hold their blob forever.
+        created_before = datetime.now(timezone.utc) - timedelta(
+            seconds=settings.file_unattached_ttl
+        )
+        return await self._delete_files(
+            session,
+            and_(
+                File.created_at < created_before,
+                ~exists().where(message_files.c.file_id == File.id),
+            ),
+        )
+
+    async def _delete_files(self, session: AsyncSession, condition: Any) -> int:
+        result = await session.execute(
+            select(File)
+            .where(condition)
+            .limit(settings.purge_batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        files = list(result.scalars().all())
+        if not files:
+            return 0
+
+        for db_file in files:
+            await session.delete(db_file)
+        await session.flush()
+        orphaned = await self.file_service.release_files(files, session)
+        await self.file_service.commit_and_remove(session, orphaned)
+        return len(files)
+
+    async def _delete_messages(
+        self, session: AsyncSession, condition: Any, keep_tombstones: bool
+    ) -> int:
+        result = await session.execute(
+            select(Message)
+            .options(selectinload(Message.files))
+            .where(condition)
+            .limit(settings.purge_batch_size)
+            .with_for_update(of=Message, skip_locked=True)
+        )
+        messages = list(result.scalars().all())
+        if not messages:
+            return 0
+
+        if keep_tombstones:
+            session.add_all(
+                MessageTombstone(chat_id=m.chat_id, message_id=m.id, seq=m.seq)
+                for m in messages
+            )
+        file_ids = {f.id for m in messages for f in m.files}
+        for message in messages:
+            await session.delete(message)
+        await session.flush()
+
+        # A file may be shared with messages that stay (forwards), so only
+        # the ones nothing links to any more go, each exactly once.
+        orphaned = []
+        if file_ids:
+            result = await session.scalars(
+                delete(File)
+                .where(
+                    File.id.in_(file_ids),
+                    ~exists().where(message_files.c.file_id == File.id),
+                )
+                .returning(File)
+            )
+            orphaned = await self.file_service.release_files(result.all(), session)
+        await self.file_service.commit_and_remove(session, orphaned)
+        return len(messages)
+
+
+purge_service = PurgeService(FileService())
@@ -1,10 +1,95 @@
-from sqlalchemy import select
+import uuid
+from typing import Optional
+
+from sqlalchemy import Float, Integer, cast, func, or_, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.pagination import decode_cursor, encode_cursor
 from app.models.user_model import User
+from app.schemas import serializers
+from app.schemas.user_schema import UserPage, UserRead
+
+
+def like_prefix(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%"
 
 
 class UserService:
-    async def get_all_users(self, session: AsyncSession):
-        result = await session.execute(select(User))
-        return result.scalars().all()
+    async def search_users(
+        self,
+        user_id: uuid.UUID,
+        text: str,
+        session: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+    ) -> UserPage:
+        rows, next_cursor = await self._search(user_id, text, session, cursor, limit)
+        return UserPage(
+            items=[
+                UserRead(id=user, nickname=nickname, email=email)
+                for user, nickname, email in rows
+            ],
+            next_cursor=next_cursor,
+        )
+
+    async def search_users_json(
+        self,
+        user_id: uuid.UUID,
+        text: str,
+        session: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+    ) -> bytes:
+        rows, next_cursor = await self._search(user_id, text, session, cursor, limit)
+        return serializers.page_json(
+            [serializers.user_json(*row) for row in rows], next_cursor
+        )
+
+    async def _search(
+        self,
+        user_id: uuid.UUID,
+        text: str,
+        session: AsyncSession,
+        cursor: Optional[str],
+        limit: int,
+    ) -> tuple[list[tuple[uuid.UUID, str, str]], Optional[str]]:
+        term = text.strip().lower()
+        nickname = func.lower(User.nickname)
+        email = func.lower(User.email)
+
+        # Prefix matches come first, then fuzzy ones by trigram similarity;
+        # both conditions are answered from the trigram indexes.
+        prefix = or_(nickname.like(like_prefix(term)), email.like(like_prefix(term)))
+        is_prefix = cast(prefix, Integer)
+        score = cast(
+            func.greatest(
+                func.similarity(nickname, term), func.similarity(email, term)
+            ),
+            Float,
+        )
+
+        query = select(User.id, User.nickname, User.email, is_prefix, score).where(
+            or_(prefix, nickname.op("%")(term), email.op("%")(term)),
+            User.id != user_id,
+        )
+        if cursor:
+            query = query.where(
+                tuple_(is_prefix, score, User.id)
+                < decode_cursor(cursor, int, float, uuid.UUID)
+            )
+
+        result = await session.execute(
+            query.order_by(is_prefix.desc(), score.desc(), User.id.desc()).limit(
+                limit + 1
+            )
+        )
+        rows = list(result.all())
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(last[3], last[4], last.id)
+
+        return [(row.id, row.nickname, row.email) for row in rows], next_cursor
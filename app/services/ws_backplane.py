@@ -0,0 +1,118 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Optional, Set
+from uuid import UUID
+
+import asyncpg
+
+from app.core.config import settings
+from app.core.encoding import dumps_text
+
+# Events travel as already-encoded JSON frames so that no worker has to
+# serialize the same event twice.
+EventHandler = Callable[[UUID, str], Awaitable[None]]
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more.
+MAX_NOTIFY_PAYLOAD = 7999
+
+
+class Backplane(ABC):
+    def __init__(self) -> None:
+        self.handler: Optional[EventHandler] = None
+
+    async def start(self, handler: EventHandler) -> None:
+        self.handler = handler
+
+    async def stop(self) -> None:
+        self.handler = None
+
+    @abstractmethod
+    async def publish(self, chat_id: UUID, frame: str) -> None: ...
+
+
+class InMemoryBackplane(Backplane):
+    async def publish(self, chat_id: UUID, frame: str) -> None:
+        if self.handler:
+            await self.handler(chat_id, frame)
+
+
+class PostgresBackplane(Backplane):
+    def __init__(self, dsn: str, channel: str = "chat_events") -> None:
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self.listener: Optional[asyncpg.Connection] = None
+        self.publisher: Optional[asyncpg.Pool] = None
+        self.closing = False
+        self.tasks: Set[asyncio.Task] = set()
+
+    async def start(self, handler: EventHandler) -> None:
+        await super().start(handler)
+        self.closing = False
+        self.publisher = await asyncpg.create_pool(self.dsn, min_size=1, max_size=4)
+        await self._connect_listener()
+
+    async def stop(self) -> None:
+        self.closing = True
+        for task in list(self.tasks):
+            task.cancel()
+        if self.listener and not self.listener.is_closed():
+            await self.listener.close()
+        if self.publisher:
+            await self.publisher.close()
+        await super().stop()
+
+    async def publish(self, chat_id: UUID, frame: str) -> None:
+        if not self.publisher:
+            raise RuntimeError("Backplane is not started")
+
+        payload = f"{chat_id} {frame}"
+        if len(payload.encode()) > MAX_NOTIFY_PAYLOAD:
+            # The event is already committed, so it must not fail here; the
+            # chat's clients are told to fetch it through sync instead.
+            resync = dumps_text({"type": "RESYNC", "chatId": str(chat_id)})
+            payload = f"{chat_id} {resync}"
+
+        await self.publisher.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+
+    async def _connect_listener(self) -> None:
+        self.listener = await asyncpg.connect(self.dsn)
+        await self.listener.add_listener(self.channel, self._on_notify)
+        self.listener.add_termination_listener(self._on_listener_lost)
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str) -> None:
+        if not self.handler:
+            return
+        chat_id, frame = payload.split(" ", 1)
+        self._spawn(self.handler(UUID(chat_id), frame))
+
+    def _on_listener_lost(self, connection) -> None:
+        if not self.closing:
+            print(">>> Backplane listener lost, reconnecting")
+            self._spawn(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        delay = 0.5
+        while not self.closing:
+            try:
+                await self._connect_listener()
+                print(">>> Backplane listener reconnected")
+                return
+            except (OSError, asyncpg.PostgresError) as e:
+                print(f">>> Backplane reconnect failed: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 10)
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        task = asyncio.ensure_future(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+
+def create_backplane() -> Backplane:
+    if settings.ws_backplane == "postgres":
+        return PostgresBackplane(
+            dsn=settings.db_url.replace("+asyncpg", ""),
+            channel=settings.ws_backplane_channel,
+        )
+    return InMemoryBackplane()
@@ -1,51 +1,185 @@
-from typing import Dict, List, Optional
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set
 from uuid import UUID
 
-from fastapi import WebSocket
+from fastapi import WebSocket, status
+from starlette.websockets import WebSocketState
+
+from app.core.config import settings
+from app.core.encoding import dumps_text
+from app.core.metrics import (
+    ws_broadcast_recipients,
+    ws_connections,
+    ws_send_duration,
+    ws_send_failures,
+)
+from app.services.ws_backplane import Backplane, create_backplane
+
+RESYNC_FRAME = dumps_text({"type": "RESYNC"})
+
+
+class Connection:
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_id: UUID,
+        queue_size: int,
+        send_timeout: float,
+    ):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.chat_ids: Set[UUID] = set()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.send_timeout = send_timeout
+        self.resync_pending = False
+        self.writer: Optional[asyncio.Task] = None
+
+    def start(self, on_failure: Callable[["Connection"], Awaitable[None]]):
+        self.writer = asyncio.create_task(self._write(on_failure))
+
+    def enqueue(self, frame: str) -> bool:
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def request_resync(self):
+        # The client has fallen too far behind to catch up frame by frame,
+        # so drop what is pending and ask it to refetch instead.
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(RESYNC_FRAME)
+        self.resync_pending = True
+
+    async def close(self, code: int = status.WS_1000_NORMAL_CLOSURE):
+        if self.writer and self.writer is not asyncio.current_task():
+            self.writer.cancel()
+        if self.websocket.client_state != WebSocketState.CONNECTED:
+            return
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), self.send_timeout)
+        except Exception as e:
+            print(f">>> Error while closing WS: {e}")
+
+    async def _write(self, on_failure: Callable[["Connection"], Awaitable[None]]):
+        try:
+            while True:
+                frame = await self.queue.get()
+                if frame is RESYNC_FRAME:
+                    self.resync_pending = False
+                started = time.perf_counter()
+                await asyncio.wait_for(
+                    self.websocket.send_text(frame), self.send_timeout
+                )
+                ws_send_duration.observe(time.perf_counter() - started)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            ws_send_failures.inc()
+            print(f">>> Error sending WS message: {e}")
+            await on_failure(self)
 
 
 class SocketService:
-    def __init__(self):
-        self.connections: Dict[UUID, List[WebSocket]] = {}
+    def __init__(self, backplane: Optional[Backplane] = None):
+        self.sockets_by_user: Dict[UUID, Set[Connection]] = {}
+        self.users_by_chat: Dict[UUID, Set[UUID]] = {}
+        self.backplane = backplane or create_backplane()
+        self.tasks: Set[asyncio.Task] = set()
+
+    async def start(self):
+        await self.backplane.start(self.deliver)
+
+    async def stop(self):
+        await self.backplane.stop()
 
-    async def connect(self, chat_id: UUID, websocket: WebSocket):
+    async def connect(
+        self, user_id: UUID, websocket: WebSocket, chat_ids: Iterable[UUID] = ()
+    ) -> Connection:
         await websocket.accept()
-        if chat_id not in self.connections:
-            self.connections[chat_id] = []
-        self.connections[chat_id].append(websocket)
-        print(
-            f">>> User connected to chat {chat_id}, total: {len(self.connections[chat_id])}"
+        connection = Connection(
+            websocket,
+            user_id=user_id,
+            queue_size=settings.ws_send_queue_size,
+            send_timeout=settings.ws_send_timeout,
         )
-
-    async def disconnect(self, chat_id: UUID, websocket: WebSocket):
-        print(f">>> Disconnecting from chat {chat_id}")
-        if chat_id in self.connections:
-            if websocket in self.connections[chat_id]:
-                self.connections[chat_id].remove(websocket)
-                try:
-                    await websocket.close()
-                except Exception as e:
-                    print(f">>> Error while closing WS: {e}")
-            if not self.connections[chat_id]:
-                del self.connections[chat_id]
+        self.sockets_by_user.setdefault(user_id, set()).add(connection)
+        ws_connections.inc()
+        self.subscribe(connection, chat_ids)
+        connection.start(self._drop)
         print(
-            f">>> Remaining connections for chat {chat_id}: {len(self.connections.get(chat_id, []))}"
+            f">>> User {user_id} connected, sockets: {len(self.sockets_by_user[user_id])}"
         )
+        return connection
 
-    async def broadcast(
-        self, chat_id: UUID, message: dict, sender: Optional[WebSocket] = None
+    async def disconnect(
+        self, connection: Connection, code: int = status.WS_1000_NORMAL_CLOSURE
     ):
-        print(f">>> Broadcasting message to chat {chat_id}")
-        if chat_id not in self.connections:
+        sockets = self.sockets_by_user.get(connection.user_id)
+        if not sockets or connection not in sockets:
+            return
+
+        print(f">>> Disconnecting user {connection.user_id}")
+        self.unsubscribe(connection, list(connection.chat_ids))
+        sockets.discard(connection)
+        ws_connections.dec()
+        if not sockets:
+            del self.sockets_by_user[connection.user_id]
+
+        await connection.close(code)
+
+    def subscribe(self, connection: Connection, chat_ids: Iterable[UUID]):
+        for chat_id in chat_ids:
+            connection.chat_ids.add(chat_id)
+            self.users_by_chat.setdefault(chat_id, set()).add(connection.user_id)
+
+    def unsubscribe(self, connection: Connection, chat_ids: Iterable[UUID]):
+        siblings = self.sockets_by_user.get(connection.user_id, set())
+        for chat_id in chat_ids:
+            connection.chat_ids.discard(chat_id)
+            if any(chat_id in other.chat_ids for other in siblings):
+                continue
+            users = self.users_by_chat.get(chat_id)
+            if users is not None:
+                users.discard(connection.user_id)
+                if not users:
+                    del self.users_by_chat[chat_id]
+
+    def send(self, connection: Connection, message: dict):
+        self._enqueue(connection, dumps_text(message))
+
+    async def broadcast(self, chat_id: UUID, message: dict):
+        # Encoded once here; every recipient on every worker shares the frame.
+        await self.backplane.publish(chat_id, dumps_text(message))
+
+    async def deliver(self, chat_id: UUID, frame: str):
+        # Only enqueues: every connection drains its own queue, so a slow
+        # client never holds up the others or the publishing request.
+        recipients = 0
+        for user_id in list(self.users_by_chat.get(chat_id, ())):
+            for connection in list(self.sockets_by_user.get(user_id, ())):
+                if chat_id in connection.chat_ids:
+                    self._enqueue(connection, frame)
+                    recipients += 1
+        ws_broadcast_recipients.observe(recipients)
+
+    def _enqueue(self, connection: Connection, frame: str):
+        if connection.enqueue(frame):
             return
+        if connection.resync_pending:
+            self._spawn(self.disconnect(connection, status.WS_1013_TRY_AGAIN_LATER))
+        else:
+            connection.request_resync()
+
+    async def _drop(self, connection: Connection):
+        await self.disconnect(connection, status.WS_1011_INTERNAL_ERROR)
 
-        for connection in list(self.connections[chat_id]):
-            if connection != sender:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    print(f">>> Error sending WS message: {e}")
-                    await self.disconnect(chat_id, connection)
+    def _spawn(self, coro: Awaitable[None]):
+        task = asyncio.ensure_future(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
 
 
 ws_service = SocketService()
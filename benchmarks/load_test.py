@@ -0,0 +1,349 @@
+"""HTTP load test: latency percentiles, throughput and queries per request.
+
+    alembic upgrade head
+    python -m benchmarks.load_test --concurrency 32 --duration 30 --output load.json
+
+Unless --base-url points at a running server, uvicorn is started on a free
+port against DB_URL with X-DB-Query-Count enabled and admission control off.
+Users, chats and history are seeded through the API first, then every worker
+repeatedly picks a random user and a scenario from the weighted --mix.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+import httpx
+
+from benchmarks.password_hashing import percentile
+
+PASSWORD = "load-test-password"
+SCENARIOS = ("login", "chats", "history", "send", "attach")
+
+
+@dataclass
+class Actor:
+    email: str
+    user_id: str
+    headers: dict[str, str]
+    chat_ids: list[str]
+    history_cursors: dict[str, Optional[str]] = field(default_factory=dict)
+
+
+@dataclass
+class Sample:
+    scenario: str
+    status: int
+    seconds: float
+    queries: Optional[int]
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r}, expected one of {SCENARIOS}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args) -> tuple[subprocess.Popen, str]:
+    port = free_port()
+    env = {
+        **os.environ,
+        "DB_QUERY_COUNT_HEADER": "1",
+        "ADMISSION_ENABLED": "1" if args.admission else "0",
+    }
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(args.server_workers),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/openapi.json")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise SystemExit("Server did not become ready")
+
+
+async def seed(client: httpx.AsyncClient, args) -> list[Actor]:
+    tag = uuid.uuid4().hex[:8]
+    actors = []
+    for i in range(args.users):
+        email = f"load-{tag}-{i}@example.com"
+        response = await client.post(
+            "/api/auth/signup",
+            json={"email": email, "password": PASSWORD, "nickname": f"load-{tag}-{i}"},
+        )
+        response.raise_for_status()
+        token = response.json()["accessToken"]
+        headers = {"Authorization": f"Bearer {token}"}
+        me = (await client.get("/api/users/me", headers=headers)).json()
+        actors.append(Actor(email, me["id"], headers, chat_ids=[]))
+
+    # A ring of one-to-one chats, so every user has two conversations.
+    semaphore = asyncio.Semaphore(16)
+    for i, actor in enumerate(actors):
+        peer = actors[(i + 1) % len(actors)]
+        response = await client.post(
+            "/api/chats/", json={"receiverId": peer.user_id}, headers=actor.headers
+        )
+        if response.status_code != 201:
+            continue
+        chat_id = response.json()["id"]
+        actor.chat_ids.append(chat_id)
+        peer.chat_ids.append(chat_id)
+
+        async def send(n: int, chat_id: str = chat_id) -> None:
+            async with semaphore:
+                author = actor if n % 2 else peer
+                response = await client.post(
+                    "/api/messages/",
+                    data={"chat_id": chat_id, "content": f"seed message {n}"},
+                    headers=author.headers,
+                )
+                response.raise_for_status()
+
+        await asyncio.gather(*(send(n) for n in range(args.history)))
+
+    return [actor for actor in actors if actor.chat_ids]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, actor: Actor, scenario: str, args, rng: random.Random
+) -> httpx.Response:
+    fast = {"fast": "true"} if args.fast else {}
+
+    if scenario == "login":
+        return await client.post(
+            "/api/auth/login", json={"login": actor.email, "password": PASSWORD}
+        )
+
+    if scenario == "chats":
+        return await client.get(
+            "/api/chats/user", params={"limit": 50, **fast}, headers=actor.headers
+        )
+
+    chat_id = rng.choice(actor.chat_ids)
+
+    if scenario == "history":
+        # Scrolls back one page per call and starts over at the top.
+        cursor = actor.history_cursors.get(chat_id)
+        params = {"limit": args.page_size, **fast}
+        if cursor:
+            params["before"] = cursor
+        response = await client.get(
+            f"/api/messages/chat/{chat_id}", params=params, headers=actor.headers
+        )
+        if response.status_code == 200:
+            actor.history_cursors[chat_id] = response.json()["nextCursor"]
+        return response
+
+    files = None
+    if scenario == "attach":
+        files = [("files", ("load.bin", rng.randbytes(args.attachment_bytes)))]
+    return await client.post(
+        "/api/messages/",
+        data={"chat_id": chat_id, "content": f"load test {scenario}"},
+        files=files,
+        headers=actor.headers,
+    )
+
+
+async def worker(
+    client: httpx.AsyncClient,
+    actors: list[Actor],
+    weights: dict[str, float],
+    args,
+    rng: random.Random,
+    warmup_until: float,
+    deadline: float,
+    samples: list[Sample],
+) -> None:
+    names, shares = list(weights), list(weights.values())
+    while time.monotonic() < deadline:
+        if args.requests and len(samples) >= args.requests:
+            return
+        actor = rng.choice(actors)
+        scenario = rng.choices(names, shares)[0]
+
+        started = time.perf_counter()
+        try:
+            response = await run_scenario(client, actor, scenario, args, rng)
+            status = response.status_code
+            queries = response.headers.get("x-db-query-count")
+        except httpx.HTTPError:
+            status, queries = 0, None
+        elapsed = time.perf_counter() - started
+
+        if time.monotonic() >= warmup_until:
+            samples.append(
+                Sample(scenario, status, elapsed, int(queries) if queries else None)
+            )
+
+
+def summarize(samples: list[Sample], seconds: float) -> dict[str, Any]:
+    latencies = [s.seconds for s in samples]
+    queries = [s.queries for s in samples if s.queries is not None]
+    statuses: dict[str, int] = defaultdict(int)
+    for s in samples:
+        statuses[str(s.status)] += 1
+
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if not 200 <= s.status < 400),
+        "statuses": dict(sorted(statuses.items())),
+        "rps": len(samples) / seconds if seconds else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 50) * 1000,
+            "p95": percentile(latencies, 95) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "mean": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+            "max": max(latencies, default=0.0) * 1000,
+        },
+        "queries_per_request": statistics.fmean(queries) if queries else None,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", help="Test a running server instead")
+    parser.add_argument("--server-workers", type=int, default=1)
+    parser.add_argument("--admission", action="store_true", help="Keep rate limits")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--requests", type=int, default=0, help="Stop after N")
+    parser.add_argument("--mix", default="login=1,chats=4,history=8,send=4,attach=1")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--history", type=int, default=200, help="Seeded per chat")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--attachment-bytes", type=int, default=64 * 1024)
+    parser.add_argument("--fast", action="store_true", help="Use ?fast=true lists")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="load_test_results.json")
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        server, base_url = start_server(args)
+
+    limits = httpx.Limits(max_connections=args.concurrency + 16)
+    try:
+        async with httpx.AsyncClient(
+            base_url=base_url, limits=limits, timeout=60
+        ) as client:
+            await wait_until_ready(client, timeout=30)
+            actors = await seed(client, args)
+            print(f"seeded {len(actors)} users, {args.history} messages per chat")
+
+            samples: list[Sample] = []
+            started_at = datetime.now(timezone.utc)
+            warmup_until = time.monotonic() + args.warmup
+            deadline = warmup_until + args.duration
+            await asyncio.gather(
+                *(
+                    worker(
+                        client,
+                        actors,
+                        weights,
+                        args,
+                        random.Random(rng.random()),
+                        warmup_until,
+                        deadline,
+                        samples,
+                    )
+                    for _ in range(args.concurrency)
+                )
+            )
+            measured = min(args.duration, time.monotonic() - warmup_until)
+
+            server_stats = {}
+            for name in ("db-pool", "password-hashing", "admission"):
+                response = await client.get(f"/api/system/{name}")
+                if response.status_code == 200:
+                    server_stats[name] = response.json()
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+
+    by_scenario: dict[str, list[Sample]] = defaultdict(list)
+    for sample in samples:
+        by_scenario[sample.scenario].append(sample)
+
+    result = {
+        "started_at": started_at.isoformat(),
+        "base_url": base_url,
+        "config": vars(args),
+        "duration_seconds": measured,
+        "total": summarize(samples, measured),
+        "scenarios": {
+            name: summarize(by_scenario[name], measured)
+            for name in weights
+            if by_scenario[name]
+        },
+        "server": server_stats,
+    }
+    with open(args.output, "w") as output:
+        json.dump(result, output, indent=2)
+
+    print(
+        f"{'scenario':>10} {'reqs':>7} {'err':>5} {'rps':>8} "
+        f"{'p50':>8} {'p95':>8} {'p99':>8} {'q/req':>6}"
+    )
+    for name, summary in [("total", result["total"]), *result["scenarios"].items()]:
+        latency = summary["latency_ms"]
+        queries = summary["queries_per_request"]
+        print(
+            f"{name:>10} {summary['requests']:>7} {summary['errors']:>5} "
+            f"{summary['rps']:>8.1f} {latency['p50']:>8.1f} {latency['p95']:>8.1f} "
+            f"{latency['p99']:>8.1f} {queries if queries is None else round(queries, 1)!s:>6}"
+        )
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+"""Login throughput and event-loop stall with inline vs off-loop argon2.
+
+    python -m benchmarks.password_hashing --logins 200 --concurrency 50
+
+A ticker task sleeps for a fixed interval and records how late it wakes up;
+that lateness is what every WebSocket and request on the loop would see.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.core.config import settings
+from app.core.hashing import PasswordHasher
+
+TICK_SECONDS = 0.001
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+async def measure_stalls(stop: asyncio.Event, stalls: list[float]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        stalls.append(time.perf_counter() - started - TICK_SECONDS)
+
+
+async def run(mode: str, hasher: PasswordHasher, password_hash: str, args) -> dict:
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def login() -> None:
+        async with semaphore:
+            if mode == "inline":
+                hasher.context.verify("password", password_hash)
+            else:
+                await hasher.verify("password", password_hash)
+            # Yield like a real handler would between its awaits.
+            await asyncio.sleep(0)
+
+    stop = asyncio.Event()
+    stalls: list[float] = []
+    ticker = asyncio.create_task(measure_stalls(stop, stalls))
+    await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(args.logins)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await ticker
+
+    return {
+        "mode": mode,
+        "logins_per_second": args.logins / elapsed,
+        "stall_p50_ms": percentile(stalls, 50) * 1000,
+        "stall_p99_ms": percentile(stalls, 99) * 1000,
+        "stall_max_ms": max(stalls, default=0.0) * 1000,
+        "stall_mean_ms": statistics.fmean(stalls) * 1000 if stalls else 0.0,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=settings.password_hash_workers)
+    args = parser.parse_args()
+
+    hasher = PasswordHasher(
+        workers=args.workers,
+        max_pending=args.logins,
+        time_cost=settings.argon2_time_cost,
+        memory_cost=settings.argon2_memory_cost,
+        parallelism=settings.argon2_parallelism,
+    )
+    password_hash = hasher.context.hash("password")
+
+    print(
+        f"argon2 t={settings.argon2_time_cost} m={settings.argon2_memory_cost} "
+        f"p={settings.argon2_parallelism}, {args.logins} logins, "
+        f"concurrency {args.concurrency}, {args.workers} hash workers"
+    )
+    for mode in ("inline", "executor"):
+        result = await run(mode, hasher, password_hash, args)
+        print(
+            f"{result['mode']:>8}: {result['logins_per_second']:7.1f} logins/s, "
+            f"loop stall p50 {result['stall_p50_ms']:7.2f} ms, "
+            f"p99 {result['stall_p99_ms']:7.2f} ms, "
+            f"max {result['stall_max_ms']:7.2f} ms"
+        )
+
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+"""Per-row cost of encoding message pages: response models vs row tuples.
+
+    python -m benchmarks.serialization --rows 1000 --files 1 --rounds 20
+
+"models" is what GET /api/messages/chat/{id} does by default: MessageRead per
+ORM row, then FastAPI validates the page against response_model and renders
+it. "rows" is the ?fast=true path: column tuples straight to JSON bytes.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.models import File, Message, User
+from app.schemas import serializers
+from app.schemas.message_schema import MessagePage, MessageRead
+
+
+def make_messages(rows: int, files: int) -> list[Message]:
+    author = User(id=uuid.uuid4(), nickname="author", email="author@example.com")
+    chat_id = uuid.uuid4()
+    started = datetime.now(timezone.utc)
+    return [
+        Message(
+            id=uuid.uuid4(),
+            chat_id=chat_id,
+            content=f"message number {i} with a little bit of text",
+            created_at=started + timedelta(milliseconds=i),
+            seq=i + 1,
+            author_id=author.id,
+            author=author,
+            files=[
+                File(
+                    id=uuid.uuid4(),
+                    filename=f"photo-{i}-{j}.png",
+                    path=f"uploads/{i}/{j}",
+                    size=1024,
+                    mime_type="image/png",
+                    width=640,
+                    height=480,
+                    thumbnail_path=f"uploads/thumbnails/{i}/{j}.webp",
+                )
+                for j in range(files)
+            ],
+        )
+        for i in range(rows)
+    ]
+
+
+def to_rows(messages: list[Message]) -> list[tuple]:
+    # The shape get_chat_messages_json reads from the database.
+    return [
+        (
+            (m.id, m.chat_id, m.content, m.created_at, m.seq, m.author_id),
+            m.author.nickname,
+            [
+                (f.id, f.filename, f.mime_type, f.width, f.height, f.thumbnail_path)
+                for f in m.files
+            ],
+        )
+        for m in messages
+    ]
+
+
+async def encode_models(messages: list[Message], field) -> bytes:
+    page = MessagePage(
+        items=[MessageRead.model_validate(m) for m in messages], next_cursor=None
+    )
+    content = await serialize_response(field=field, response_content=page)
+    return JSONResponse(content).body
+
+
+def encode_rows(rows: list[tuple]) -> bytes:
+    return serializers.page_json(
+        [
+            serializers.message_json(
+                *columns,
+                nickname,
+                [serializers.file_json(*file_row) for file_row in files],
+            )
+            for columns, nickname, files in rows
+        ],
+        None,
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--files", type=int, default=1, help="Files per message")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    messages = make_messages(args.rows, args.files)
+    rows = to_rows(messages)
+    field = create_model_field(name="Response", type_=MessagePage, mode="serialization")
+
+    timings: dict[str, list[float]] = {"models": [], "rows": []}
+    sizes: dict[str, int] = {}
+    for _ in range(args.rounds):
+        started = time.perf_counter()
+        body = await encode_models(messages, field)
+        timings["models"].append(time.perf_counter() - started)
+        sizes["models"] = len(body)
+
+        started = time.perf_counter()
+        body = encode_rows(rows)
+        timings["rows"].append(time.perf_counter() - started)
+        sizes["rows"] = len(body)
+
+    print(f"{args.rows} messages, {args.files} file(s) each, {args.rounds} rounds")
+    for mode, samples in timings.items():
+        page = statistics.median(samples)
+        print(
+            f"{mode:>7}: {page * 1000:8.2f} ms/page, "
+            f"{page / args.rows * 1e6:7.2f} us/row, {sizes[mode]} bytes"
+        )
+    speedup = statistics.median(timings["models"]) / statistics.median(timings["rows"])
+    print(f"speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,206 @@
+import asyncio
+
+import pytest
+
+from app.core import admission
+from app.core.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    RateLimit,
+    TokenBuckets,
+)
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    return clock
+
+
+def make_controller(max_in_flight: int = 100, max_keys: int = 100):
+    controller = AdmissionController()
+    controller.enabled = True
+    controller.max_in_flight = max_in_flight
+    controller.limits = {
+        "auth": RateLimit(1, 2),
+        "send": RateLimit(5, 30),
+        "default": RateLimit(10, 3),
+    }
+    controller.buckets = TokenBuckets(max_keys)
+    return controller
+
+
+def scope(path: str = "/api/chats/user", method: str = "GET", ip: str = "10.0.0.1"):
+    return {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "headers": [],
+        "client": (ip, 5000),
+    }
+
+
+def test_burst_then_refill(clock):
+    buckets = TokenBuckets(max_keys=10)
+    limit = RateLimit(rate=2, burst=3)
+    key = ("default", "ip:1")
+
+    assert [buckets.take(key, limit) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take(key, limit) == pytest.approx(0.5)
+
+    clock.now += 0.5
+    assert buckets.take(key, limit) == 0
+    assert buckets.take(key, limit) == pytest.approx(0.5)
+
+    # Refill stops at the burst size.
+    clock.now += 60
+    assert [buckets.take(key, limit) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take(key, limit) > 0
+
+
+def test_zero_rate_disables_the_limit(clock):
+    buckets = TokenBuckets(max_keys=10)
+    limit = RateLimit(rate=0, burst=0)
+
+    assert all(buckets.take(("auth", "ip:1"), limit) == 0 for _ in range(100))
+    assert not buckets.buckets
+
+
+def test_least_recently_used_keys_are_evicted(clock):
+    buckets = TokenBuckets(max_keys=2)
+    limit = RateLimit(rate=1, burst=1)
+
+    buckets.take(("default", "a"), limit)
+    buckets.take(("default", "b"), limit)
+    buckets.take(("default", "a"), limit)
+    buckets.take(("default", "c"), limit)
+
+    assert list(buckets.buckets) == [("default", "a"), ("default", "c")]
+    # An evicted caller comes back with a full bucket.
+    assert buckets.take(("default", "b"), limit) == 0
+
+
+def test_rate_limited_callers_get_429(clock):
+    controller = make_controller()
+
+    for _ in range(3):
+        assert controller.admit(scope()) is None
+        controller.release()
+
+    status, detail, retry_after = controller.admit(scope())
+    assert status == 429
+    assert retry_after == pytest.approx(0.1)
+    assert controller.rejected_rate == {"default": 1}
+    # Other callers and route classes keep their own buckets.
+    assert controller.admit(scope(ip="10.0.0.2")) is None
+    assert controller.admit(scope("/api/messages/", "POST")) is None
+
+
+def test_in_flight_cap_sheds_with_503(clock):
+    controller = make_controller(max_in_flight=2)
+
+    assert controller.admit(scope(ip="10.0.0.1")) is None
+    assert controller.admit(scope(ip="10.0.0.2")) is None
+    assert controller.admit(scope(ip="10.0.0.3")) == (
+        503,
+        "Server is busy, try again later",
+        1,
+    )
+    assert controller.rejected_overload == 1
+
+    controller.release()
+    assert controller.admit(scope(ip="10.0.0.3")) is None
+    assert controller.in_flight_peak == 2
+
+
+def test_auth_routes_are_limited_per_address(clock):
+    controller = make_controller()
+    login = scope("/api/auth/login", "POST")
+
+    assert controller.admit(login) is None
+    assert controller.admit(login) is None
+    status, _, retry_after = controller.admit(login)
+    assert (status, retry_after) == (429, pytest.approx(1))
+
+
+def test_take_send_charges_the_user_send_bucket(clock):
+    controller = make_controller()
+    controller.limits["send"] = RateLimit(1, 2)
+
+    assert controller.take_send("u1") == 0
+    assert controller.take_send("u1") == 0
+    assert controller.take_send("u1") == pytest.approx(1)
+    assert controller.take_send("u2") == 0
+    assert controller.rejected_rate == {"send": 1}
+
+
+def run_middleware(controller, request_scope, app=None):
+    sent = []
+
+    async def ok_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = AdmissionMiddleware(app or ok_app)
+    middleware.controller = controller
+    asyncio.run(middleware(request_scope, receive, send))
+    return sent
+
+
+def test_rejections_carry_retry_after(clock):
+    controller = make_controller()
+    controller.limits["default"] = RateLimit(0.25, 1)
+
+    [start, _] = run_middleware(controller, scope())
+    assert start["status"] == 200
+
+    [start, body] = run_middleware(controller, scope())
+    assert start["status"] == 429
+    assert (b"retry-after", b"4") in start["headers"]
+    assert body["body"] == b'{"detail":"Too many requests"}'
+
+    controller.max_in_flight = 0
+    [start, _] = run_middleware(controller, scope(ip="10.0.0.9"))
+    assert start["status"] == 503
+    assert (b"retry-after", b"1") in start["headers"]
+
+
+def test_slot_is_released_when_the_response_starts(clock):
+    controller = make_controller()
+    in_flight_during_body = []
+
+    async def streaming_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        in_flight_during_body.append(controller.in_flight)
+        await send({"type": "http.response.body", "body": b"chunk"})
+
+    run_middleware(controller, scope(), streaming_app)
+
+    assert in_flight_during_body == [0]
+    assert controller.in_flight == 0
+
+
+def test_slot_is_released_when_the_app_fails(clock):
+    controller = make_controller()
+
+    async def failing_app(scope, receive, send):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        run_middleware(controller, scope(), failing_app)
+    assert controller.in_flight == 0
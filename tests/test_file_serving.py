@@ -0,0 +1,39 @@
+import pytest
+
+from app.api.routes.file_router import etag_matches, is_inline
+
+ETAG = '"0123abcd"'
+
+
+@pytest.mark.parametrize(
+    "if_none_match, expected",
+    [
+        (None, False),
+        ("", False),
+        ('"0123abcd"', True),
+        ('W/"0123abcd"', True),
+        ('"other", "0123abcd"', True),
+        ('"other",W/"0123abcd"', True),
+        ("*", True),
+        ('"other"', False),
+        ("0123abcd", False),
+    ],
+)
+def test_etag_matches(if_none_match, expected):
+    assert etag_matches(if_none_match, ETAG) is expected
+
+
+@pytest.mark.parametrize(
+    "media_type, expected",
+    [
+        ("image/png", True),
+        ("video/mp4", True),
+        ("audio/ogg", True),
+        ("image/svg+xml", False),
+        ("text/html", False),
+        ("application/pdf", False),
+        ("application/octet-stream", False),
+    ],
+)
+def test_only_passive_media_is_inline(media_type, expected):
+    assert is_inline(media_type) is expected
@@ -0,0 +1,43 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 10, 18, 9, 30, 15, 123456, tzinfo=timezone.utc)
+    message_id = uuid.uuid4()
+
+    cursor = encode_cursor(created_at, message_id)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, datetime.fromisoformat, uuid.UUID) == (
+        created_at,
+        message_id,
+    )
+
+
+def test_cursor_round_trip_with_numbers():
+    message_id = uuid.uuid4()
+
+    cursor = encode_cursor(0.0421, message_id)
+
+    assert decode_cursor(cursor, float, uuid.UUID) == (0.0421, message_id)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "zz",
+        "not base64 at all!",
+        encode_cursor("2026-10-18T09:30:15+00:00"),
+        encode_cursor("yesterday", uuid.uuid4()),
+    ],
+)
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, datetime.fromisoformat, uuid.UUID)
+    assert error.value.status_code == 400
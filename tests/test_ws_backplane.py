@@ -0,0 +1,73 @@
+import asyncio
+import json
+import uuid
+
+import asyncpg
+import pytest
+
+from app.core.config import settings
+from app.services.ws_backplane import MAX_NOTIFY_PAYLOAD, PostgresBackplane
+
+DSN = settings.db_url.replace("+asyncpg", "")
+
+
+async def can_connect() -> bool:
+    try:
+        connection = await asyncpg.connect(DSN, timeout=5)
+    except (OSError, asyncpg.PostgresError, asyncio.TimeoutError):
+        return False
+    await connection.close()
+    return True
+
+
+pytestmark = pytest.mark.skipif(
+    not asyncio.run(can_connect()), reason="Postgres is not reachable at DB_URL"
+)
+
+
+async def run_workers(frames: list[str], count: int = 2) -> list[list[tuple]]:
+    # Separate backplanes on one channel stand in for separate workers.
+    channel = f"test_{uuid.uuid4().hex}"
+    chat_id = uuid.uuid4()
+    received: list[list[tuple]] = [[] for _ in range(count)]
+    done = asyncio.Event()
+
+    def handler(inbox: list[tuple]):
+        async def handle(chat_id: uuid.UUID, frame: str) -> None:
+            inbox.append((chat_id, frame))
+            if all(len(r) == len(frames) for r in received):
+                done.set()
+
+        return handle
+
+    backplanes = [PostgresBackplane(DSN, channel) for _ in range(count)]
+    for backplane, inbox in zip(backplanes, received):
+        await backplane.start(handler(inbox))
+    try:
+        for frame in frames:
+            await backplanes[0].publish(chat_id, frame)
+        await asyncio.wait_for(done.wait(), timeout=5)
+    finally:
+        for backplane in backplanes:
+            await backplane.stop()
+
+    assert all(c == chat_id for r in received for c, _ in r)
+    return received
+
+
+def test_publish_reaches_every_worker():
+    frames = [json.dumps({"type": "NEW_MESSAGE", "n": n}) for n in range(3)]
+
+    received = asyncio.run(run_workers(frames))
+
+    for inbox in received:
+        assert [frame for _, frame in inbox] == frames
+
+
+def test_oversized_frame_falls_back_to_resync():
+    frame = json.dumps({"type": "NEW_MESSAGE", "content": "x" * MAX_NOTIFY_PAYLOAD})
+
+    received = asyncio.run(run_workers([frame]))
+
+    for [(chat_id, resync)] in received:
+        assert json.loads(resync) == {"type": "RESYNC", "chatId": str(chat_id)}